@@ -2,16 +2,67 @@
 Admin configuration for accounts models
 """
 
+import csv
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from itertools import chain
+
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import AdminPasswordChangeForm
-from django.utils.html import format_html
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.utils.html import format_html, format_html_join
+from django.utils.safestring import mark_safe
 from django.urls import path, reverse
-from django.shortcuts import redirect, get_object_or_404, render
+from django.shortcuts import redirect, get_object_or_404
+from django.template.response import TemplateResponse
 from django.contrib import messages
-from django.http import HttpResponseRedirect
-from .models import UserProfile, AuditLog
+from django.db import transaction
+from django.http import HttpResponseRedirect, StreamingHttpResponse
+from .models import ADMIN_DEPARTMENTS_CACHE_KEY, DEPARTMENTS_TIMEOUT, UserProfile, AuditLog
+
+
+# Markup for the staff record link shown in the account changelists
+STAFF_LINK_HTML = '<a href="{}" title="View Staff Record">{}</a>'
+
+
+class Echo:
+    """File-like object that hands each written CSV row straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+@lru_cache(maxsize=None)
+def url_template(viewname):
+    """Reverse an admin URL once with a placeholder pk so rows only need str.format()"""
+    return reverse(viewname, args=[0]).replace('/0/', '/{}/')
+
+
+class ProfileDepartmentFilter(admin.SimpleListFilter):
+    """Department filter backed by a cached list instead of a DISTINCT query per render"""
+    title = 'department'
+    parameter_name = 'profile__department'
+
+    def lookups(self, request, model_admin):
+        departments = cache.get_or_set(
+            ADMIN_DEPARTMENTS_CACHE_KEY,
+            lambda: list(
+                UserProfile.objects.exclude(department='')
+                .values_list('department', flat=True).distinct().order_by('department')
+            ),
+            DEPARTMENTS_TIMEOUT
+        )
+        return [(department, department) for department in departments]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(profile__department=self.value())
+        return queryset
 
 
 class UserProfileInline(admin.StackedInline):
@@ -20,6 +71,7 @@ class UserProfileInline(admin.StackedInline):
     can_delete = False
     verbose_name_plural = 'Profile'
     readonly_fields = ['id', 'created_at', 'updated_at']
+    autocomplete_fields = ['line_manager']
 
     fieldsets = (
         ('Role & Department', {
@@ -34,8 +86,10 @@ class UserProfileInline(admin.StackedInline):
         ('Permissions & Access', {
             'fields': ('can_view_all_kpas', 'can_approve_updates', 'can_generate_reports')
         }),
+        # dashboard_preferences is edited on the UserProfile admin page only,
+        # keeping its JSON widget off the user change form
         ('User Preferences', {
-            'fields': ('is_active_user', 'email_notifications', 'dashboard_preferences'),
+            'fields': ('is_active_user', 'email_notifications'),
             'classes': ('collapse',)
         }),
         ('Profile Picture', {
@@ -52,8 +106,9 @@ class UserProfileInline(admin.StackedInline):
 class UserAdmin(BaseUserAdmin):
     inlines = (UserProfileInline,)
     list_display = ['username', 'email', 'first_name', 'last_name', 'get_role', 'get_staff_link', 'is_active', 'last_login', 'password_actions']
-    list_filter = ['is_active', 'is_staff', 'is_superuser', 'profile__primary_role', 'profile__department', 'profile__is_active_user']
+    list_filter = ['is_active', 'is_staff', 'is_superuser', 'profile__primary_role', ProfileDepartmentFilter, 'profile__is_active_user']
     search_fields = ['username', 'first_name', 'last_name', 'email', 'profile__employee_number']
+    list_select_related = ('profile', 'profile__staff_member')
     actions = ['reset_passwords', 'activate_users', 'deactivate_users']
 
     # Enhanced fieldsets for comprehensive user management
@@ -73,19 +128,27 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('profile', 'profile__staff_member')
+
+    # profile is loaded via list_select_related, so a missing profile raises
+    # DoesNotExist from the cache instead of issuing another query
     def get_role(self, obj):
-        if hasattr(obj, 'profile'):
+        try:
             return obj.profile.get_primary_role_display()
-        return 'No Profile'
+        except UserProfile.DoesNotExist:
+            return 'No Profile'
     get_role.short_description = 'Role'
 
     def get_staff_link(self, obj):
         """Show link to staff member if linked"""
-        if hasattr(obj, 'profile') and obj.profile.staff_member:
+        try:
             staff = obj.profile.staff_member
+        except UserProfile.DoesNotExist:
+            staff = None
+        if staff:
             return format_html(
-                '<a href="/admin/core/staff/{}/change/" title="View Staff Record">{}</a>',
-                staff.id, staff.persal_number
+                STAFF_LINK_HTML, url_template('admin:core_staff_change').format(staff.id), staff.persal_number
             )
         return '—'
     get_staff_link.short_description = 'Staff Record'
@@ -95,29 +158,33 @@ class UserAdmin(BaseUserAdmin):
         if obj.pk:
             return format_html(
                 '<a class="button" href="{}">Change Password</a>',
-                reverse('admin:auth_user_password_change', args=[obj.pk])
+                url_template('admin:auth_user_password_change').format(obj.pk)
             )
         return '—'
     password_actions.short_description = 'Password'
 
     def get_urls(self):
-        urls = super().get_urls()
-        custom_urls = [
-            path('<int:user_id>/reset-password/', self.admin_site.admin_view(self.reset_password_view), name='auth_user_reset_password'),
-        ]
-        return custom_urls + urls
+        # The URL patterns never change after startup, so build them once
+        if not hasattr(self, '_cached_urls'):
+            custom_urls = [
+                path('<int:user_id>/reset-password/', self.admin_site.admin_view(self.reset_password_view), name='auth_user_reset_password'),
+            ]
+            self._cached_urls = custom_urls + super().get_urls()
+        return self._cached_urls
 
     def reset_password_view(self, request, user_id):
         """Custom password reset view for admins"""
-        user = get_object_or_404(User, pk=user_id)
-
         if request.method == 'POST':
-            form = AdminPasswordChangeForm(user, request.POST)
-            if form.is_valid():
-                form.save()
-                messages.success(request, f'Password for {user.username} has been changed successfully.')
-                return HttpResponseRedirect(reverse('admin:auth_user_changelist'))
+            # Lock the row so the form's full user.save() can't overwrite a concurrent update
+            with transaction.atomic():
+                user = get_object_or_404(User.objects.select_for_update(), pk=user_id)
+                form = AdminPasswordChangeForm(user, request.POST)
+                if form.is_valid():
+                    form.save()
+                    messages.success(request, f'Password for {user.username} has been changed successfully.')
+                    return HttpResponseRedirect(reverse('admin:auth_user_changelist'))
         else:
+            user = get_object_or_404(User, pk=user_id)
             form = AdminPasswordChangeForm(user)
 
         context = {
@@ -134,44 +201,47 @@ class UserAdmin(BaseUserAdmin):
             'save_as': False,
             'show_save': True,
         }
-        return admin.site.admin_view(lambda r: render(r, 'admin/auth/user/change_password.html', context))(request)
+        # get_urls() already wraps this view with admin_view (auth + never_cache)
+        return TemplateResponse(request, 'admin/auth/user/change_password.html', context)
 
     # Bulk actions
     def reset_passwords(self, request, queryset):
         """Bulk password reset action"""
-        import secrets
-        import string
+        users = list(queryset.select_related(None).only('id', 'username'))
+        # 9 random bytes encode to exactly 12 URL-safe characters
+        passwords = [secrets.token_urlsafe(9) for _ in users]
 
-        count = 0
-        temp_passwords = []
+        # Hash in parallel (hashlib releases the GIL) and write every row in one batched UPDATE.
+        # Temp passwords use the cheap hasher; Django upgrades the hash on first login.
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            hashes = list(pool.map(partial(make_password, hasher='pbkdf2_temp'), passwords))
+        for user, password_hash in zip(users, hashes):
+            user.password = password_hash
+        User.objects.bulk_update(users, ['password'], batch_size=500)
 
-        for user in queryset:
-            # Generate a temporary password
-            temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
-            user.set_password(temp_password)
-            user.save()
-            count += 1
-
-            # Store for display
-            temp_passwords.append(f'{user.username}: {temp_password}')
+        count = len(users)
 
         # Display all temporary passwords
-        password_list = '<br>'.join(temp_passwords)
+        password_list = format_html_join(
+            mark_safe('<br>'), '{}: <code>{}</code>',
+            ((user.username, password) for user, password in zip(users, passwords))
+        )
         messages.success(request, format_html(
-            f'Reset passwords for {count} users:<br><strong>{password_list}</strong><br>'
-            f'<small>Please save these passwords and share them securely with the users.</small>'
+            'Reset passwords for {} users:<br><strong>{}</strong><br>'
+            '<small>Please save these passwords and share them securely with the users.</small>',
+            count, password_list
         ))
     reset_passwords.short_description = 'Reset selected users\' passwords (generates temp passwords)'
 
     def activate_users(self, request, queryset):
         """Bulk activate users"""
-        updated = queryset.update(is_active=True)
+        updated = queryset.filter(is_active=False).update(is_active=True)
         self.message_user(request, f'{updated} user(s) activated.')
     activate_users.short_description = 'Activate selected users'
 
     def deactivate_users(self, request, queryset):
         """Bulk deactivate users"""
-        updated = queryset.update(is_active=False)
+        updated = queryset.filter(is_active=True).update(is_active=False)
         self.message_user(request, f'{updated} user(s) deactivated.')
     deactivate_users.short_description = 'Deactivate selected users'
 
@@ -197,6 +267,8 @@ class UserProfileAdmin(admin.ModelAdmin):
     ]
     readonly_fields = ['id', 'created_at', 'updated_at', 'created_by', 'updated_by']
     list_editable = ['is_active_user', 'can_approve_updates']
+    list_select_related = ('user', 'staff_member')
+    autocomplete_fields = ['user', 'line_manager']
     actions = ['activate_profiles', 'deactivate_profiles', 'grant_approval_rights', 'revoke_approval_rights']
 
     fieldsets = (
@@ -227,12 +299,19 @@ class UserProfileAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # JSON preferences and picture paths are never shown in the list columns
+        return super().get_queryset(request).select_related('user', 'staff_member').defer(
+            'dashboard_preferences', 'profile_picture'
+        )
+
     def get_staff_link(self, obj):
         """Show link to staff member if linked"""
         if obj.staff_member:
             return format_html(
-                '<a href="/admin/core/staff/{}/change/" title="View Staff Record">{}</a>',
-                obj.staff_member.id, obj.staff_member.persal_number
+                STAFF_LINK_HTML,
+                url_template('admin:core_staff_change').format(obj.staff_member.id),
+                obj.staff_member.persal_number
             )
         return '—'
     get_staff_link.short_description = 'Staff Record'
@@ -243,34 +322,43 @@ class UserProfileAdmin(admin.ModelAdmin):
             return format_html(
                 '<a class="button" href="{}">Edit User</a> '
                 '<a class="button" href="{}">Change Password</a>',
-                reverse('admin:auth_user_change', args=[obj.user.pk]),
-                reverse('admin:auth_user_password_change', args=[obj.user.pk])
+                url_template('admin:auth_user_change').format(obj.user.pk),
+                url_template('admin:auth_user_password_change').format(obj.user.pk)
             )
         return '—'
     user_actions.short_description = 'User Actions'
 
     # Bulk actions
+    @staticmethod
+    def _update_profiles(queryset, **values):
+        """Bulk update(), then drop the cached permissions that update() leaves stale"""
+        user_ids = list(queryset.values_list('user_id', flat=True))
+        updated = queryset.update(**values)
+        for user_id in user_ids:
+            UserProfile.forget_permissions(user_id)
+        return updated
+
     def activate_profiles(self, request, queryset):
         """Bulk activate user profiles"""
-        updated = queryset.update(is_active_user=True)
+        updated = self._update_profiles(queryset.filter(is_active_user=False), is_active_user=True)
         self.message_user(request, f'{updated} profile(s) activated.')
     activate_profiles.short_description = 'Activate selected profiles'
 
     def deactivate_profiles(self, request, queryset):
         """Bulk deactivate user profiles"""
-        updated = queryset.update(is_active_user=False)
+        updated = self._update_profiles(queryset.filter(is_active_user=True), is_active_user=False)
         self.message_user(request, f'{updated} profile(s) deactivated.')
     deactivate_profiles.short_description = 'Deactivate selected profiles'
 
     def grant_approval_rights(self, request, queryset):
         """Grant approval rights to selected profiles"""
-        updated = queryset.update(can_approve_updates=True)
+        updated = self._update_profiles(queryset.filter(can_approve_updates=False), can_approve_updates=True)
         self.message_user(request, f'Granted approval rights to {updated} profile(s).')
     grant_approval_rights.short_description = 'Grant approval rights'
 
     def revoke_approval_rights(self, request, queryset):
         """Revoke approval rights from selected profiles"""
-        updated = queryset.update(can_approve_updates=False)
+        updated = self._update_profiles(queryset.filter(can_approve_updates=True), can_approve_updates=False)
         self.message_user(request, f'Revoked approval rights from {updated} profile(s).')
     revoke_approval_rights.short_description = 'Revoke approval rights'
 
@@ -281,6 +369,13 @@ class UserProfileAdmin(admin.ModelAdmin):
         super().save_model(request, obj, form, change)
 
 
+class AuditLogChangeList(ChangeList):
+    """Audit changelist that leaves the JSON payloads, which can be large, out of the rows"""
+
+    def get_queryset(self, request, *args, **kwargs):
+        return super().get_queryset(request, *args, **kwargs).defer('changes', 'additional_data')
+
+
 @admin.register(AuditLog)
 class AuditLogAdmin(admin.ModelAdmin):
     list_display = [
@@ -293,6 +388,12 @@ class AuditLogAdmin(admin.ModelAdmin):
     search_fields = [
         'user_email', 'object_repr', 'model_name', 'user_ip_address'
     ]
+    list_select_related = ('user',)
+    date_hierarchy = 'timestamp'
+    list_per_page = 50
+    # Skip the unfiltered COUNT(*) over the whole audit table on every page
+    show_full_result_count = False
+    actions = ['export_selected']
     readonly_fields = [
         'id', 'user', 'user_email', 'user_ip_address', 'action',
         'model_name', 'object_id', 'object_repr', 'changes',
@@ -314,6 +415,22 @@ class AuditLogAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_changelist(self, request, **kwargs):
+        # Only the list defers the payloads; the detail page shows them
+        return AuditLogChangeList
+
+    def export_selected(self, request, queryset):
+        """Stream selected audit entries as CSV without loading them all into memory"""
+        writer = csv.writer(Echo())
+        rows = queryset.values_list(*AuditLog.EXPORT_FIELDS).iterator(chunk_size=2000)
+        response = StreamingHttpResponse(
+            (writer.writerow(row) for row in chain([AuditLog.EXPORT_FIELDS], rows)),
+            content_type='text/csv'
+        )
+        response['Content-Disposition'] = 'attachment; filename="audit_log.csv"'
+        return response
+    export_selected.short_description = 'Export selected entries to CSV'
+
     def has_add_permission(self, request):
         return False
 
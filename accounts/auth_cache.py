@@ -0,0 +1,56 @@
+"""
+Short-lived memory of rejected credentials for the login views
+
+Retry loops and credential-stuffing bursts resend the same bad username and
+password many times a second. Remembering a rejection for a few seconds lets
+those repeats skip the deliberately slow password hash. Credentials are only
+kept as a keyed BLAKE2b digest with a per-process random key, never in clear.
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from django.contrib.auth import authenticate
+
+
+REJECTION_TTL = 5  # seconds
+MAX_REJECTIONS = 4096
+
+_digest_key = os.urandom(32)
+_rejections = {}
+_lock = threading.Lock()
+
+
+def _credentials_digest(username, password):
+    digest = hashlib.blake2b(key=_digest_key, digest_size=32)
+    digest.update(username.encode())
+    digest.update(b'\0')
+    digest.update(password.encode())
+    return digest.digest()
+
+
+def _remember_rejection(digest, now):
+    with _lock:
+        if len(_rejections) >= MAX_REJECTIONS:
+            for expired in [key for key, expires in _rejections.items() if expires <= now]:
+                del _rejections[expired]
+            if len(_rejections) >= MAX_REJECTIONS:
+                _rejections.clear()
+        _rejections[digest] = now + REJECTION_TTL
+
+
+def authenticate_once(request, username, password):
+    """authenticate(), except credentials rejected in the last few seconds are rejected without hashing"""
+    digest = _credentials_digest(username, password)
+    now = time.monotonic()
+    with _lock:
+        expires = _rejections.get(digest)
+    if expires is not None and expires > now:
+        return None
+
+    user = authenticate(request, username=username, password=password)
+    if user is None:
+        _remember_rejection(digest, now)
+    return user
@@ -3,11 +3,95 @@ Forms for user account management and profile editing
 """
 
 from django import forms
+from django.contrib.auth import password_validation
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import PasswordChangeForm, UserCreationForm, SetPasswordForm
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db.models import Exists, OuterRef
+from django.db.utils import OperationalError, ProgrammingError
 from .models import UserProfile
-from core.models import Staff
+from core.models import OrgUnit, Staff
+from core.permissions import user_is_system_admin
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Characters allowed as separators in phone numbers, stripped before validation
+PHONE_SEPARATORS = str.maketrans('', '', ' -()')
+
+OFFICE_CHOICES = (
+    ('', '— Select Office Location —'),
+    ('Head Office, Floor 1', 'Head Office, Floor 1'),
+    ('Head Office, Floor 2', 'Head Office, Floor 2'),
+    ('Head Office, Floor 3', 'Head Office, Floor 3'),
+    ('Head Office, Floor 4', 'Head Office, Floor 4'),
+    ('Head Office, Floor 5', 'Head Office, Floor 5'),
+    ('Regional Office - Gauteng', 'Regional Office - Gauteng'),
+    ('Regional Office - Western Cape', 'Regional Office - Western Cape'),
+    ('Regional Office - KwaZulu-Natal', 'Regional Office - KwaZulu-Natal'),
+    ('Remote/Home Office', 'Remote/Home Office'),
+    ('Other', 'Other'),
+)
+
+PROFILE_CHOICES_CACHE_KEY = 'accounts:profile_choices'
+PROFILE_CHOICES_TIMEOUT = 300
+
+
+def build_profile_choices():
+    """Build the organizational dropdown choices used by UserProfileForm"""
+    org_units = OrgUnit.objects.filter(is_active=True).order_by('unit_type', 'name').only('name', 'unit_type')
+    type_labels = dict(OrgUnit.UNIT_TYPE_CHOICES)
+
+    # Department and unit/subdirectorate choices
+    department_choices = [('', '— Select Department —')]
+    unit_choices = [('', '— Select Unit —')]
+    for unit in org_units:
+        name = unit.name
+        department_choices.append((name, f"{name} ({type_labels.get(unit.unit_type, unit.unit_type)})"))
+        unit_choices.append((name, name))
+
+    # Job title choices from existing staff
+    job_titles = Staff.objects.filter(is_active=True).values_list('job_title', flat=True).distinct().order_by('job_title')
+    job_title_choices = [('', '— Select Job Title —')] + [
+        (title, title) for title in job_titles.iterator() if title  # Skip empty titles
+    ]
+
+    return {
+        'department': department_choices,
+        'unit': unit_choices,
+        'job_title': job_title_choices,
+    }
+
+
+def get_profile_choices():
+    """Cached organizational dropdown choices, cleared when OrgUnit/Staff rows change"""
+    return cache.get_or_set(PROFILE_CHOICES_CACHE_KEY, build_profile_choices, PROFILE_CHOICES_TIMEOUT)
+
+
+def build_fallback_fields(form):
+    """Swap the organizational dropdowns for plain text inputs"""
+    for field_name in ('department', 'unit_subdirectorate', 'job_title', 'office_location'):
+        form.fields[field_name] = forms.CharField(
+            max_length=200,
+            required=False,
+            widget=forms.TextInput(attrs={'class': 'form-control'})
+        )
+
+
+def department_choices():
+    """Lazy choices for UserProfileForm.department"""
+    return get_profile_choices()['department']
+
+
+def unit_choices():
+    """Lazy choices for UserProfileForm.unit_subdirectorate"""
+    return get_profile_choices()['unit']
+
+
+def job_title_choices():
+    """Lazy choices for UserProfileForm.job_title"""
+    return get_profile_choices()['job_title']
 
 
 class UserProfileForm(forms.ModelForm):
@@ -41,6 +125,31 @@ class UserProfileForm(forms.ModelForm):
             'placeholder': 'Enter your email address'
         })
     )
+
+    # Organizational dropdowns; choices are resolved lazily from the shared cache
+    department = forms.ChoiceField(
+        choices=department_choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    unit_subdirectorate = forms.ChoiceField(
+        choices=unit_choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    job_title = forms.ChoiceField(
+        choices=job_title_choices,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    office_location = forms.ChoiceField(
+        choices=OFFICE_CHOICES,
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
     
     class Meta:
         model = UserProfile
@@ -101,6 +210,8 @@ class UserProfileForm(forms.ModelForm):
         }
     
     def __init__(self, *args, **kwargs):
+        # Pass `user` with its profile already loaded (select_related('profile'))
+        # to avoid a lazy profile query for the role check below
         self.user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
 
@@ -110,112 +221,42 @@ class UserProfileForm(forms.ModelForm):
             self.fields['last_name'].initial = self.instance.user.last_name or ''
             self.fields['email'].initial = self.instance.user.email or ''
 
-        # Create dropdown fields for organizational data
+        # Organizational fields aren't in Meta.fields, so seed their initial values here
+        for field_name in ('department', 'unit_subdirectorate', 'job_title', 'office_location'):
+            self.fields[field_name].initial = getattr(self.instance, field_name)
+
+        # Resolve the dropdown choices once up front so a database failure falls
+        # back to text inputs here rather than erroring at render time
         try:
-            from core.models import OrgUnit, Staff
-
-            # Get organizational units and staff data
-            org_units = OrgUnit.objects.filter(is_active=True).order_by('unit_type', 'name')
-
-            # Department choices
-            department_choices = [('', '— Select Department —')]
-            for unit in org_units:
-                department_choices.append((unit.name, f"{unit.name} ({unit.get_unit_type_display()})"))
-
-            # Unit/subdirectorate choices
-            unit_choices = [('', '— Select Unit —')]
-            for unit in org_units:
-                unit_choices.append((unit.name, unit.name))
-
-            # Job title choices from existing staff
-            job_titles = Staff.objects.filter(is_active=True).values_list('job_title', flat=True).distinct().order_by('job_title')
-            job_title_choices = [('', '— Select Job Title —')]
-            for title in job_titles:
-                if title:  # Skip empty titles
-                    job_title_choices.append((title, title))
-
-            # Office location choices
-            office_choices = [
-                ('', '— Select Office Location —'),
-                ('Head Office, Floor 1', 'Head Office, Floor 1'),
-                ('Head Office, Floor 2', 'Head Office, Floor 2'),
-                ('Head Office, Floor 3', 'Head Office, Floor 3'),
-                ('Head Office, Floor 4', 'Head Office, Floor 4'),
-                ('Head Office, Floor 5', 'Head Office, Floor 5'),
-                ('Regional Office - Gauteng', 'Regional Office - Gauteng'),
-                ('Regional Office - Western Cape', 'Regional Office - Western Cape'),
-                ('Regional Office - KwaZulu-Natal', 'Regional Office - KwaZulu-Natal'),
-                ('Remote/Home Office', 'Remote/Home Office'),
-                ('Other', 'Other'),
-            ]
-
-            # Create the dropdown fields
-            self.fields['department'] = forms.ChoiceField(
-                choices=department_choices,
-                required=False,
-                widget=forms.Select(attrs={'class': 'form-select'}),
-                initial=self.instance.department if self.instance else ''
-            )
-
-            self.fields['unit_subdirectorate'] = forms.ChoiceField(
-                choices=unit_choices,
-                required=False,
-                widget=forms.Select(attrs={'class': 'form-select'}),
-                initial=self.instance.unit_subdirectorate if self.instance else ''
-            )
-
-            self.fields['job_title'] = forms.ChoiceField(
-                choices=job_title_choices,
-                required=False,
-                widget=forms.Select(attrs={'class': 'form-select'}),
-                initial=self.instance.job_title if self.instance else ''
-            )
-
-            self.fields['office_location'] = forms.ChoiceField(
-                choices=office_choices,
-                required=False,
-                widget=forms.Select(attrs={'class': 'form-select'}),
-                initial=self.instance.office_location if self.instance else ''
-            )
-
-        except Exception:
-            # Fallback to simple text fields if there's an error
-            for field_name in ['department', 'unit_subdirectorate', 'job_title', 'office_location']:
-                self.fields[field_name] = forms.CharField(
-                    max_length=200,
-                    required=False,
-                    widget=forms.TextInput(attrs={'class': 'form-control'})
-                )
+            get_profile_choices()
+        except (OperationalError, ProgrammingError):
+            logger.warning("Organizational choices unavailable, using text inputs", exc_info=True)
+            build_fallback_fields(self)
 
 
 
         # Filter line manager choices to exclude self and inactive users
         if self.user:
+            # Options are labelled with str(user), i.e. the username, so only fetch that
             self.fields['line_manager'].queryset = User.objects.filter(
-                is_active=True,
-                profile__is_active_user=True
-            ).exclude(id=self.user.id).order_by('first_name', 'last_name')
+                Exists(UserProfile.objects.filter(user=OuterRef('pk'), is_active_user=True)),
+                is_active=True
+            ).exclude(id=self.user.id).order_by('first_name', 'last_name').only('id', 'username')
 
         # Add help text
         self.fields['employee_number'].help_text = "Your unique employee identifier"
         self.fields['line_manager'].help_text = "Select your direct line manager"
         self.fields['email_notifications'].help_text = "Receive email notifications for updates and reminders"
 
-        # Handle primary_role field based on user permissions
-        # If user is editing their own profile, make primary_role optional and hidden
-        if (self.user and self.instance and hasattr(self.instance, 'user') and
-            self.instance.user == self.user):
-            # User is editing their own profile - hide primary_role and make it optional
+        # Handle primary_role field based on user permissions: users editing their
+        # own profile and non-admins editing others get it hidden and optional.
+        # Compare FK ids so neither side's user row has to be loaded.
+        is_self_edit = bool(self.user and self.instance.user_id == self.user.id)
+        if is_self_edit or not self.user or not user_is_system_admin(self.user):
             self.fields['primary_role'].widget = forms.HiddenInput()
             self.fields['primary_role'].required = False
             if self.instance.primary_role:
                 self.fields['primary_role'].initial = self.instance.primary_role
-        elif not self.user or not hasattr(self.user, 'profile') or not self.user.profile.primary_role == 'SYSTEM_ADMIN':
-            # Non-admin users editing other profiles - also hide and make optional
-            self.fields['primary_role'].widget = forms.HiddenInput()
-            self.fields['primary_role'].required = False
-            if self.instance and self.instance.primary_role:
-                self.fields['primary_role'].initial = self.instance.primary_role
 
         # Apply error highlighting if form is bound and has errors
         if self.is_bound and self.errors:
@@ -223,27 +264,21 @@ class UserProfileForm(forms.ModelForm):
 
     def add_error_classes(self):
         """Add Bootstrap validation classes to fields with errors"""
-        for field_name, field in self.fields.items():
-            if field_name in self.errors:
-                # Get current CSS classes
-                current_classes = field.widget.attrs.get('class', '')
-
-                # Add is-invalid class if not already present
-                if 'is-invalid' not in current_classes:
-                    field.widget.attrs['class'] = f"{current_classes} is-invalid".strip()
-            else:
-                # Remove is-invalid class if field is valid
-                current_classes = field.widget.attrs.get('class', '')
-                if 'is-invalid' in current_classes:
-                    field.widget.attrs['class'] = current_classes.replace('is-invalid', '').strip()
+        # Fields are copied fresh for each form instance, so only errored fields need touching
+        for field_name in self.errors:
+            field = self.fields.get(field_name)
+            if field is None:
+                continue  # Non-field errors
+            current_classes = field.widget.attrs.get('class', '')
+            if 'is-invalid' not in current_classes:
+                field.widget.attrs['class'] = f"{current_classes} is-invalid".strip()
 
     def clean_email(self):
         """Validate email uniqueness"""
         email = self.cleaned_data.get('email')
         if email and self.user:
             # Check if email is already taken by another user
-            existing_user = User.objects.filter(email=email).exclude(id=self.user.id).first()
-            if existing_user:
+            if User.objects.filter(email=email).exclude(id=self.user.id).exists():
                 raise ValidationError("This email address is already in use by another user.")
         return email
     
@@ -252,10 +287,9 @@ class UserProfileForm(forms.ModelForm):
         employee_number = self.cleaned_data.get('employee_number')
         if employee_number:
             # Check if employee number is already taken
-            existing_profile = UserProfile.objects.filter(
+            if UserProfile.objects.filter(
                 employee_number=employee_number
-            ).exclude(id=self.instance.id if self.instance else None).first()
-            if existing_profile:
+            ).exclude(id=self.instance.id if self.instance else None).exists():
                 raise ValidationError("This employee number is already in use.")
         return employee_number
 
@@ -264,7 +298,7 @@ class UserProfileForm(forms.ModelForm):
         phone_number = self.cleaned_data.get('phone_number')
         if phone_number:
             # Remove spaces and dashes for validation
-            cleaned_phone = phone_number.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
+            cleaned_phone = phone_number.translate(PHONE_SEPARATORS)
             if not cleaned_phone.isdigit():
                 raise ValidationError("Phone number must contain only numbers, spaces, and dashes.")
             if len(cleaned_phone) < 10:
@@ -276,7 +310,7 @@ class UserProfileForm(forms.ModelForm):
         mobile_number = self.cleaned_data.get('mobile_number')
         if mobile_number:
             # Remove spaces and dashes for validation
-            cleaned_mobile = mobile_number.replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
+            cleaned_mobile = mobile_number.translate(PHONE_SEPARATORS)
             if not cleaned_mobile.isdigit():
                 raise ValidationError("Mobile number must contain only numbers, spaces, and dashes.")
             if len(cleaned_mobile) < 10:
@@ -303,19 +337,14 @@ class UserProfileForm(forms.ModelForm):
 
             # Update related User fields if they exist in cleaned_data
             if self.user and hasattr(self, 'cleaned_data'):
-                user_updated = False
-                if 'first_name' in self.cleaned_data and self.cleaned_data['first_name']:
-                    self.user.first_name = self.cleaned_data['first_name']
-                    user_updated = True
-                if 'last_name' in self.cleaned_data and self.cleaned_data['last_name']:
-                    self.user.last_name = self.cleaned_data['last_name']
-                    user_updated = True
-                if 'email' in self.cleaned_data and self.cleaned_data['email']:
-                    self.user.email = self.cleaned_data['email']
-                    user_updated = True
-
-                if user_updated:
-                    self.user.save()
+                updated_fields = []
+                for field_name in ('first_name', 'last_name', 'email'):
+                    if self.cleaned_data.get(field_name):
+                        setattr(self.user, field_name, self.cleaned_data[field_name])
+                        updated_fields.append(field_name)
+
+                if updated_fields:
+                    self.user.save(update_fields=updated_fields)
 
         return profile
 
@@ -395,20 +424,38 @@ class CustomPasswordChangeForm(PasswordChangeForm):
     """
     Custom password change form with Bootstrap styling
     """
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        
-        # Add Bootstrap classes to all fields
-        for field_name, field in self.fields.items():
-            field.widget.attrs.update({
-                'class': 'form-control'
-            })
-        
-        # Update help text
-        self.fields['old_password'].help_text = "Enter your current password"
-        self.fields['new_password1'].help_text = "Enter your new password (at least 8 characters)"
-        self.fields['new_password2'].help_text = "Confirm your new password"
+
+    # Redeclare the inherited fields with Bootstrap classes and help text set up front
+    old_password = forms.CharField(
+        label="Old password",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
+            'class': 'form-control',
+            'autocomplete': 'current-password',
+            'autofocus': True
+        }),
+        help_text="Enter your current password"
+    )
+
+    new_password1 = forms.CharField(
+        label="New password",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
+            'class': 'form-control',
+            'autocomplete': 'new-password'
+        }),
+        help_text="Enter your new password (at least 8 characters)"
+    )
+
+    new_password2 = forms.CharField(
+        label="New password confirmation",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
+            'class': 'form-control',
+            'autocomplete': 'new-password'
+        }),
+        help_text="Confirm your new password"
+    )
 
 
 class ProfilePictureForm(forms.Form):
@@ -487,6 +534,29 @@ class StaffRegistrationForm(UserCreationForm):
         widget=forms.CheckboxInput(attrs={'class': 'form-check-input'})
     )
 
+    # Redeclare the inherited password fields with Bootstrap classes set up front
+    password1 = forms.CharField(
+        label="Password",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Password',
+            'autocomplete': 'new-password'
+        }),
+        help_text="Your password must contain at least 8 characters and cannot be entirely numeric."
+    )
+
+    password2 = forms.CharField(
+        label="Password confirmation",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
+            'class': 'form-control',
+            'placeholder': 'Confirm Password',
+            'autocomplete': 'new-password'
+        }),
+        help_text="Enter the same password as before, for verification."
+    )
+
     class Meta:
         model = User
         fields = ('username', 'first_name', 'last_name', 'email', 'password1', 'password2')
@@ -497,23 +567,9 @@ class StaffRegistrationForm(UserCreationForm):
                 'id': 'id_username'
             }),
         }
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-
-        # Add Bootstrap classes to password fields
-        self.fields['password1'].widget.attrs.update({
-            'class': 'form-control',
-            'placeholder': 'Password'
-        })
-        self.fields['password2'].widget.attrs.update({
-            'class': 'form-control',
-            'placeholder': 'Confirm Password'
-        })
-
-        # Update help texts
-        self.fields['username'].help_text = "Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only."
-        self.fields['password1'].help_text = "Your password must contain at least 8 characters and cannot be entirely numeric."
+        help_texts = {
+            'username': "Required. 150 characters or fewer. Letters, digits and @/./+/-/_ only.",
+        }
 
     def clean_email(self):
         email = self.cleaned_data.get('email')
@@ -524,17 +580,19 @@ class StaffRegistrationForm(UserCreationForm):
     def clean_persal_number(self):
         persal_number = self.cleaned_data.get('persal_number')
         if persal_number:
-            # Check if PERSAL number exists in staff records
-            try:
-                staff_member = Staff.objects.get(persal_number=persal_number, is_active=True)
-
-                # Check if already linked to another user
-                if hasattr(staff_member, 'user_profile') and staff_member.user_profile:
-                    raise ValidationError("This PERSAL number is already linked to another user account.")
-
-            except Staff.DoesNotExist:
+            # Check the staff record exists and whether it is already linked, in one query
+            staff_member = Staff.objects.filter(
+                persal_number=persal_number, is_active=True
+            ).annotate(
+                has_profile=Exists(UserProfile.objects.filter(staff_member=OuterRef('pk')))
+            ).values('has_profile').first()
+
+            if staff_member is None:
                 raise ValidationError("PERSAL number not found in staff records. You can still register without it.")
 
+            if staff_member['has_profile']:
+                raise ValidationError("This PERSAL number is already linked to another user account.")
+
         return persal_number
 
     def save(self, commit=True):
@@ -562,35 +620,31 @@ class CustomPasswordResetForm(forms.Form):
     )
 
     def clean_email_or_username(self):
-        identifier = self.cleaned_data['email_or_username']
-
-        # Check if it's an email or username
-        user_exists = False
-        if '@' in identifier:
-            # Email provided
-            user_exists = User.objects.filter(email=identifier, is_active=True).exists()
-        else:
-            # Username provided
-            user_exists = User.objects.filter(username=identifier, is_active=True).exists()
-
-        if not user_exists:
-            # Don't reveal whether user exists or not for security
-            pass
-
-        return identifier
+        # Don't reveal whether the user exists; the view looks the account up itself
+        return self.cleaned_data['email_or_username']
 
 
 class CustomSetPasswordForm(SetPasswordForm):
     """Custom set password form with Bootstrap styling"""
 
-    def __init__(self, user, *args, **kwargs):
-        super().__init__(user, *args, **kwargs)
-
-        self.fields['new_password1'].widget.attrs.update({
+    # Redeclare the inherited fields with Bootstrap classes set up front
+    new_password1 = forms.CharField(
+        label="New password",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
             'class': 'form-control',
-            'placeholder': 'New Password'
-        })
-        self.fields['new_password2'].widget.attrs.update({
+            'placeholder': 'New Password',
+            'autocomplete': 'new-password'
+        }),
+        help_text=password_validation.password_validators_help_text_html()
+    )
+
+    new_password2 = forms.CharField(
+        label="New password confirmation",
+        strip=False,
+        widget=forms.PasswordInput(attrs={
             'class': 'form-control',
-            'placeholder': 'Confirm New Password'
+            'placeholder': 'Confirm New Password',
+            'autocomplete': 'new-password'
         })
+    )
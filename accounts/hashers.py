@@ -0,0 +1,17 @@
+"""
+Password hashers for the accounts app
+"""
+
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TempPasswordHasher(PBKDF2PasswordHasher):
+    """
+    Low-cost PBKDF2 hasher for admin-generated temporary passwords
+
+    Temporary passwords are long random strings, so a high iteration count adds
+    little protection while making bulk resets slow. Django upgrades the hash to
+    the default hasher the first time the user logs in with it.
+    """
+    algorithm = 'pbkdf2_temp'
+    iterations = 1000
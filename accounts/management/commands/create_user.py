@@ -4,9 +4,9 @@ Management command to create users with temporary passwords
 
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
+from django.db import transaction
 from accounts.models import UserProfile
 import secrets
-import string
 
 
 class Command(BaseCommand):
@@ -34,34 +34,27 @@ class Command(BaseCommand):
             raise CommandError(f'User "{username}" already exists.')
         
         # Generate temporary password
-        temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
+        temp_password = secrets.token_urlsafe(9)  # 12 URL-safe characters
         
-        # Create user
-        user = User.objects.create_user(
-            username=username,
-            email=options.get('email', ''),
-            first_name=options.get('first_name', ''),
-            last_name=options.get('last_name', ''),
-            password=temp_password
-        )
-        
-        # Set permissions
-        if options['staff'] or options['superuser']:
-            user.is_staff = True
-        
-        if options['superuser']:
-            user.is_superuser = True
-        
-        user.save()
-        
-        # Create or update profile
-        profile, created = UserProfile.objects.get_or_create(user=user)
-        profile.primary_role = options['role']
-        if options.get('department'):
-            profile.department = options['department']
-        if options.get('job_title'):
-            profile.job_title = options['job_title']
-        profile.save()
+        # Create user and profile together: one INSERT each
+        with transaction.atomic():
+            user = User(
+                username=username,
+                email=User.objects.normalize_email(options.get('email') or ''),
+                first_name=options.get('first_name') or '',
+                last_name=options.get('last_name') or '',
+                is_staff=options['staff'] or options['superuser'],
+                is_superuser=options['superuser'],
+            )
+            user.set_password(temp_password)
+            user.save()
+
+            profile = UserProfile.objects.create(
+                user=user,
+                primary_role=options['role'],
+                department=options.get('department') or '',
+                job_title=options.get('job_title') or '',
+            )
         
         # Output results
         self.stdout.write(
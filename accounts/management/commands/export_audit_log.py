@@ -0,0 +1,56 @@
+"""
+Management command to export the audit log as CSV
+"""
+
+import csv
+import sys
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from accounts.models import AuditLog
+
+
+class Command(BaseCommand):
+    help = 'Export audit log entries as CSV, streaming rows instead of loading them into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', type=str, help='File to write to (defaults to stdout)')
+        parser.add_argument('--since', type=str, help='Only entries on or after this date (YYYY-MM-DD)')
+        parser.add_argument('--model', type=str, help='Only entries for this model name')
+
+    def handle(self, *args, **options):
+        queryset = AuditLog.objects.order_by('-timestamp')
+
+        if options.get('since'):
+            try:
+                since = datetime.strptime(options['since'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError('--since must be a date in YYYY-MM-DD format.')
+            queryset = queryset.filter(timestamp__gte=timezone.make_aware(datetime.combine(since, time.min)))
+
+        if options.get('model'):
+            queryset = queryset.filter(model_name=options['model'])
+
+        rows = queryset.values_list(*AuditLog.EXPORT_FIELDS)
+
+        output = open(options['output'], 'w', newline='') if options.get('output') else sys.stdout
+        try:
+            if connection.vendor == 'postgresql':
+                # Let PostgreSQL render the CSV itself; no ORM rows are built at all
+                sql, params = rows.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    query = cursor.mogrify(sql, params).decode()
+                    cursor.copy_expert(f'COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)', output)
+            else:
+                writer = csv.writer(output)
+                writer.writerow(AuditLog.EXPORT_FIELDS)
+                writer.writerows(rows.iterator(chunk_size=2000))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+
+        if options.get('output'):
+            self.stdout.write(self.style.SUCCESS(f'Audit log exported to {options["output"]}'))
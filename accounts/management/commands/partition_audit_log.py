@@ -0,0 +1,157 @@
+"""
+Management command to partition the audit log table by month (PostgreSQL only)
+"""
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+
+TABLE = 'accounts_auditlog'
+LEGACY_TABLE = 'accounts_auditlog_legacy'
+
+
+def add_months(month_start, months):
+    """Return the first day of the month `months` after `month_start`"""
+    month_index = month_start.year * 12 + month_start.month - 1 + months
+    return date(month_index // 12, month_index % 12 + 1, 1)
+
+
+def partition_name(month_start):
+    return f'{TABLE}_p{month_start:%Y%m}'
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert the audit log to a monthly RANGE-partitioned table, create upcoming '
+        'partitions and optionally move old partitions to a cold tablespace or drop them. '
+        'Safe to run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months-ahead', type=int, default=3,
+                            help='Number of future monthly partitions to keep ready')
+        parser.add_argument('--cold-tablespace', type=str,
+                            help='Tablespace to move partitions older than --cold-after-days to')
+        parser.add_argument('--cold-after-days', type=int, default=90,
+                            help='Age in days after which a partition counts as cold')
+        parser.add_argument('--drop-after-months', type=int,
+                            help='Detach and drop monthly partitions that ended more than this many months ago')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Audit log partitioning requires PostgreSQL.')
+
+        this_month = timezone.now().date().replace(day=1)
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not self._is_partitioned(cursor):
+                self._convert(cursor, this_month, options['months_ahead'])
+
+            for offset in range(options['months_ahead'] + 1):
+                self._create_partition(cursor, add_months(this_month, offset))
+
+            if options.get('cold_tablespace'):
+                cutoff = timezone.now().date() - timedelta(days=options['cold_after_days'])
+                self._move_cold_partitions(cursor, options['cold_tablespace'], cutoff)
+
+            if options.get('drop_after_months'):
+                self._drop_expired_partitions(cursor, add_months(this_month, -options['drop_after_months']))
+
+        self.stdout.write(self.style.SUCCESS('Audit log partitions are up to date.'))
+
+    def _is_partitioned(self, cursor):
+        cursor.execute(
+            "SELECT c.relkind FROM pg_class c "
+            "JOIN pg_namespace n ON n.oid = c.relnamespace "
+            "WHERE c.relname = %s AND n.nspname = current_schema()",
+            [TABLE]
+        )
+        row = cursor.fetchone()
+        return bool(row) and row[0] == 'p'
+
+    def _convert(self, cursor, this_month, months_ahead):
+        """Rebuild the audit log as a partitioned table, keeping its rows, indexes and FKs"""
+        self.stdout.write('Converting audit log to a partitioned table...')
+
+        # Capture secondary indexes and foreign keys so they can be recreated on the parent
+        cursor.execute(
+            "SELECT indexdef FROM pg_indexes "
+            "WHERE schemaname = current_schema() AND tablename = %s AND indexname <> %s",
+            [TABLE, f'{TABLE}_pkey']
+        )
+        index_defs = [row[0] for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE]
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'SELECT MIN("timestamp") FROM {TABLE}')
+        oldest = cursor.fetchone()[0]
+        first_month = oldest.date().replace(day=1) if oldest else this_month
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY_TABLE}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {LEGACY_TABLE} INCLUDING DEFAULTS) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+
+        month = first_month
+        last_month = add_months(this_month, months_ahead)
+        while month <= last_month:
+            self._create_partition(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {LEGACY_TABLE}')
+        cursor.execute(f'DROP TABLE {LEGACY_TABLE}')
+
+        # The primary key of a partitioned table must include the partition key
+        cursor.execute(f'ALTER TABLE {TABLE} ADD PRIMARY KEY (id, "timestamp")')
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {connection.ops.quote_name(name)} {definition}')
+        for index_def in index_defs:
+            cursor.execute(index_def)
+
+    def _create_partition(self, cursor, month_start):
+        name = partition_name(month_start)
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{month_start.isoformat()}') TO ('{add_months(month_start, 1).isoformat()}')"
+        )
+        self.stdout.write(f'  Partition ready: {name}')
+
+    def _monthly_partitions(self, cursor):
+        """(name, end of month) for each monthly partition, skipping the default partition"""
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = %s",
+            [TABLE]
+        )
+        prefix = f'{TABLE}_p'
+        for (name,) in cursor.fetchall():
+            if not name.startswith(prefix):
+                continue  # Default partition
+            stamp = name[len(prefix):]
+            yield name, add_months(date(int(stamp[:4]), int(stamp[4:]), 1), 1)
+
+    def _move_cold_partitions(self, cursor, tablespace, cutoff):
+        """Move monthly partitions that ended before `cutoff` to the given tablespace"""
+        for name, month_end in self._monthly_partitions(cursor):
+            if month_end <= cutoff:
+                cursor.execute(f'ALTER TABLE {name} SET TABLESPACE {connection.ops.quote_name(tablespace)}')
+                self.stdout.write(f'  Moved {name} to {tablespace}')
+
+    def _drop_expired_partitions(self, cursor, cutoff):
+        """Drop monthly partitions that ended before `cutoff` (retention without a bulk DELETE)"""
+        for name, month_end in self._monthly_partitions(cursor):
+            if month_end <= cutoff:
+                cursor.execute(f'ALTER TABLE {TABLE} DETACH PARTITION {name}')
+                cursor.execute(f'DROP TABLE {name}')
+                self.stdout.write(f'  Dropped {name}')
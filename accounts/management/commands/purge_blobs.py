@@ -0,0 +1,30 @@
+"""
+Management command to delete replaced uploads from storage
+"""
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from accounts.models import DeletedBlob
+
+
+class Command(BaseCommand):
+    help = 'Delete files recorded in DeletedBlob from storage (run periodically, e.g. from cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=1000,
+                            help='Maximum number of files to delete in this run')
+
+    def handle(self, *args, **options):
+        blobs = list(DeletedBlob.objects.order_by('created_at')[:options['limit']])
+        purged = []
+        for blob in blobs:
+            try:
+                default_storage.delete(blob.path)
+            except Exception as exc:
+                self.stderr.write(f'Could not delete {blob.path}: {exc}')
+                continue
+            purged.append(blob.pk)
+
+        DeletedBlob.objects.filter(pk__in=purged).delete()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {len(purged)} of {len(blobs)} files.'))
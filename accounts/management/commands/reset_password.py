@@ -5,7 +5,6 @@ Management command to reset user passwords
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth.models import User
 import secrets
-import string
 
 
 class Command(BaseCommand):
@@ -28,16 +27,16 @@ class Command(BaseCommand):
         if options.get('password'):
             new_password = options['password']
             user.set_password(new_password)
-            user.save()
+            user.save(update_fields=['password'])
             
             self.stdout.write(
                 self.style.SUCCESS(f'Password for "{username}" has been set to the specified value.')
             )
         else:
             # Generate temporary password
-            temp_password = ''.join(secrets.choice(string.ascii_letters + string.digits) for _ in range(12))
+            temp_password = secrets.token_urlsafe(9)  # 12 URL-safe characters
             user.set_password(temp_password)
-            user.save()
+            user.save(update_fields=['password'])
             
             self.stdout.write(
                 self.style.SUCCESS(f'Password for "{username}" has been reset.')
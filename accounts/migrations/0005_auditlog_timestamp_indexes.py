@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_staff_member'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-timestamp'], name='accounts_au_timesta_40aa9a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['model_name', '-timestamp'], name='accounts_au_model_n_395b93_idx'),
+        ),
+    ]
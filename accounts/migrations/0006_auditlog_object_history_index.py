@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_auditlog_timestamp_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='auditlog',
+            name='accounts_au_model_n_76c60d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['model_name', 'object_id', '-timestamp'], name='accounts_au_model_n_8ed58e_idx'),
+        ),
+    ]
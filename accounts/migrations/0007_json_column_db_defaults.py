@@ -0,0 +1,36 @@
+# Generated by Django 4.2.7 on 2026-10-16 11:00
+
+from django.db import migrations
+
+
+JSON_COLUMNS = [
+    ('accounts_userprofile', 'dashboard_preferences'),
+    ('accounts_auditlog', 'changes'),
+    ('accounts_auditlog', 'additional_data'),
+]
+
+
+def set_json_defaults(apps, schema_editor):
+    """Give the JSON columns a server-side '{}' default (PostgreSQL only)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in JSON_COLUMNS:
+        schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT '{{}}'::jsonb")
+
+
+def drop_json_defaults(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for table, column in JSON_COLUMNS:
+        schema_editor.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_auditlog_object_history_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_json_defaults, drop_json_defaults),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 11:30
+
+from django.db import migrations, models
+
+
+def populate_full_names(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    profiles = list(UserProfile.objects.select_related('user'))
+    for profile in profiles:
+        user = profile.user
+        full_name = f"{user.first_name} {user.last_name}".strip()
+        profile.full_name_cached = full_name or user.username
+    UserProfile.objects.bulk_update(profiles, ['full_name_cached'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_json_column_db_defaults'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='full_name_cached',
+            field=models.CharField(blank=True, db_index=True, default='', editable=False, max_length=301),
+        ),
+        migrations.RunPython(populate_full_names, migrations.RunPython.noop),
+    ]
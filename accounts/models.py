@@ -5,10 +5,78 @@ This module extends Django's User model with additional fields for
 organizational hierarchy and role-based permissions.
 """
 
-from django.db import models
+import csv
+import io
+import json
+import logging
+import random
+import threading
+import uuid
+
+from django.conf import settings
+from django.db import connection, models
 from django.contrib.auth.models import User, Group
+from django.core.cache import cache
 from django.core.validators import RegexValidator
-from core.models import BaseModel
+from core.models import BaseModel, KPA, OperationalPlanItem
+
+
+# The kpa_monitoring logger writes to logs/django.log, the fallback for audit rows that can't be saved
+audit_logger = logging.getLogger('kpa_monitoring.audit')
+
+PHONE_NUMBER_PATTERN = r'^\+?1?\d{9,15}$'
+
+# Shared validator instances: each compiles its pattern once, on first use
+EMPLOYEE_NUMBER_VALIDATOR = RegexValidator(r'^[A-Z0-9]+$', 'Employee number must be alphanumeric')
+PHONE_NUMBER_VALIDATOR = RegexValidator(PHONE_NUMBER_PATTERN, 'Enter a valid phone number')
+MOBILE_NUMBER_VALIDATOR = RegexValidator(PHONE_NUMBER_PATTERN, 'Enter a valid mobile number')
+
+
+PERMISSIONS_CACHE_TIMEOUT = 300
+
+# Sentinel cached for users without a profile, so the miss isn't re-queried
+NO_PROFILE = 'none'
+
+
+ACCESSIBLE_KPAS_TIMEOUT = 600
+
+# Department filter on the user management page
+DEPARTMENTS_CACHE_KEY = 'accounts:user_management:departments'
+ADMIN_DEPARTMENTS_CACHE_KEY = 'accounts:admin:departments'
+DEPARTMENTS_TIMEOUT = 600
+
+# Token that changes whenever KPAs or plan item assignments change, invalidating
+# every cached accessible-KPA set at once
+KPA_ACCESS_VERSION_KEY = 'accounts:kpa_access_version'
+
+
+def kpa_access_version():
+    return cache.get_or_set(KPA_ACCESS_VERSION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def bump_kpa_access_version():
+    cache.set(KPA_ACCESS_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+# Registration-form AJAX checks (username taken, PERSAL number valid)
+AVAILABILITY_CACHE_TIMEOUT = 300
+
+
+def username_taken_cache_key(username):
+    return f'accounts:username_taken:{username}'
+
+
+def persal_check_cache_key(persal):
+    return f'accounts:persal_check:{persal}'
+
+
+def permissions_cache_key(user_id):
+    return f'accounts:permissions:{user_id}'
+
+
+def display_name(user):
+    """Full name of a user, falling back to the username"""
+    return user.get_full_name() or user.username
 
 
 class UserProfile(BaseModel):
@@ -23,12 +91,24 @@ class UserProfile(BaseModel):
         ('SYSTEM_ADMIN', 'System Admin'),
     ]
 
+    # Roles that can see every active KPA
+    ELEVATED_ROLES = frozenset({'SENIOR_MANAGER', 'ME_STRATEGY', 'SYSTEM_ADMIN'})
+
     user = models.OneToOneField(
         User,
         on_delete=models.CASCADE,
         related_name='profile'
     )
 
+    # Denormalized copy of display_name(user), kept in sync by a User post_save signal
+    full_name_cached = models.CharField(
+        max_length=301,
+        blank=True,
+        default='',
+        db_index=True,
+        editable=False
+    )
+
     # Link to staff member record
     staff_member = models.OneToOneField(
         'core.Staff',
@@ -44,7 +124,7 @@ class UserProfile(BaseModel):
         max_length=20,
         unique=True,
         blank=True,
-        validators=[RegexValidator(r'^[A-Z0-9]+$', 'Employee number must be alphanumeric')]
+        validators=[EMPLOYEE_NUMBER_VALIDATOR]
     )
     job_title = models.CharField(max_length=200)
     department = models.CharField(max_length=200)
@@ -59,12 +139,12 @@ class UserProfile(BaseModel):
     phone_number = models.CharField(
         max_length=20,
         blank=True,
-        validators=[RegexValidator(r'^\+?1?\d{9,15}$', 'Enter a valid phone number')]
+        validators=[PHONE_NUMBER_VALIDATOR]
     )
     mobile_number = models.CharField(
         max_length=20,
         blank=True,
-        validators=[RegexValidator(r'^\+?1?\d{9,15}$', 'Enter a valid mobile number')]
+        validators=[MOBILE_NUMBER_VALIDATOR]
     )
 
     # Profile picture
@@ -126,25 +206,101 @@ class UserProfile(BaseModel):
         verbose_name_plural = "User Profiles"
 
     def __str__(self):
-        return f"{self.user.get_full_name()} ({self.get_primary_role_display()})"
+        return f"{self.full_name} ({self.get_primary_role_display()})"
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and not self.full_name_cached:
+            self.full_name_cached = display_name(self.user)
+        super().save(*args, **kwargs)
+
+    # Large columns permission checks never read
+    PERMISSIONS_DEFERRED_FIELDS = ('dashboard_preferences', 'profile_picture')
+
+    @classmethod
+    def permissions_for(cls, user):
+        """
+        The user's profile for permission checks, or None
+
+        Loaded without the picture and preferences columns from the shared cache
+        (falling back to the database), and cached on the user's profile relation
+        so later user.profile access in the request reuses it.
+        """
+        if not user.is_authenticated:
+            return None
+
+        if not User.profile.is_cached(user):
+            profile = cls._load_permissions_profile(user.pk)
+            User.profile.related.set_cached_value(user, profile)
+            if profile is not None:
+                cls.user.field.set_cached_value(profile, user)
+
+        return getattr(user, 'profile', None)
+
+    @classmethod
+    def _load_permissions_profile(cls, user_id):
+        attnames = [
+            field.attname for field in cls._meta.concrete_fields
+            if field.name not in cls.PERMISSIONS_DEFERRED_FIELDS
+        ]
+        key = permissions_cache_key(user_id)
+        values = cache.get(key)
+        if values is None:
+            values = cls.objects.filter(user_id=user_id).values_list(*attnames).first() or NO_PROFILE
+            cache.set(key, values, PERMISSIONS_CACHE_TIMEOUT)
+        if values == NO_PROFILE:
+            return None
+        return cls.from_db(cls.objects.db, attnames, values)
+
+    @staticmethod
+    def forget_permissions(user_id):
+        """Drop the cached permission profile; call after writes that bypass save()"""
+        cache.delete(permissions_cache_key(user_id))
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The staff record linked when loaded, so unlinking can clear its cached PERSAL check
+        instance._loaded_staff_member_id = instance.__dict__.get('staff_member_id')
+        return instance
 
     @property
     def full_name(self):
-        return self.user.get_full_name() or self.user.username
+        return self.full_name_cached or display_name(self.user)
 
     def get_accessible_kpas(self):
         """Get KPAs this user can access based on role and assignments"""
-        from core.models import KPA
+        # Join owner and financial year (used by KPA.__str__) so listing KPAs doesn't go N+1
+        kpas = KPA.objects.select_related('owner', 'financial_year')
+
+        if self.can_view_all_kpas or self.primary_role in self.ELEVATED_ROLES:
+            return kpas.filter(is_active=True)
+
+        # Programme managers can see KPAs they own or are assigned to. EXISTS stops at the
+        # first matching plan item and, unlike a join, needs no DISTINCT over the result.
+        is_officer = models.Exists(OperationalPlanItem.objects.filter(
+            kpa=models.OuterRef('pk'), responsible_officers=self.user_id
+        ))
+        return kpas.filter(models.Q(owner=self.user_id) | is_officer, is_active=True)
 
-        if self.can_view_all_kpas or self.primary_role in ['SENIOR_MANAGER', 'ME_STRATEGY', 'SYSTEM_ADMIN']:
-            return KPA.objects.filter(is_active=True)
+    def get_accessible_kpa_ids(self):
+        """
+        Ids of the KPAs this user can access
 
-        # Programme managers can see KPAs they own or are assigned to
-        return KPA.objects.filter(
-            models.Q(owner=self.user) |
-            models.Q(plan_items__responsible_officer__icontains=self.user.get_full_name()),
-            is_active=True
-        ).distinct()
+        Kept on the instance for the rest of the request and in the shared cache
+        across requests. The cache key embeds updated_at, so any profile save starts
+        afresh, and the KPA access version, bumped when KPAs or assignments change.
+        """
+        if not hasattr(self, '_accessible_kpa_ids'):
+            key = (
+                f'accounts:accessible_kpas:{self.user_id}:'
+                f'{self.updated_at.timestamp() if self.updated_at else 0}:{kpa_access_version()}'
+            )
+            self._accessible_kpa_ids = cache.get_or_set(
+                key,
+                lambda: frozenset(self.get_accessible_kpas().order_by().values_list('id', flat=True)),
+                ACCESSIBLE_KPAS_TIMEOUT
+            )
+        return self._accessible_kpa_ids
 
     def can_edit_plan_item(self, plan_item):
         """Check if user can edit a specific operational plan item"""
@@ -155,8 +311,8 @@ class UserProfile(BaseModel):
             return True
 
         if self.primary_role == 'PROGRAMME_MANAGER':
-            # Check if user is the responsible officer
-            return self.user.get_full_name().lower() in plan_item.responsible_officer.lower()
+            # Check if user is one of the responsible officers
+            return plan_item.responsible_officers.filter(pk=self.user_id).exists()
 
         return False
 
@@ -178,6 +334,9 @@ class AuditLog(BaseModel):
         ('IMPORT', 'Import'),
     ]
 
+    # Columns written by CSV exports (admin action and export_audit_log command)
+    EXPORT_FIELDS = ('timestamp', 'user_email', 'action', 'model_name', 'object_repr')
+
     # Who performed the action
     user = models.ForeignKey(
         User,
@@ -239,9 +398,163 @@ class AuditLog(BaseModel):
         verbose_name_plural = "Audit Logs"
         indexes = [
             models.Index(fields=['user', 'timestamp']),
-            models.Index(fields=['model_name', 'object_id']),
+            # Object history: one object's entries, newest first
+            models.Index(fields=['model_name', 'object_id', '-timestamp']),
             models.Index(fields=['action', 'timestamp']),
+            # Admin changelist: default ordering and model_name filter
+            models.Index(fields=['-timestamp']),
+            models.Index(fields=['model_name', '-timestamp']),
         ]
 
     def __str__(self):
         return f"{self.user_email} {self.action} {self.model_name} at {self.timestamp}"
+
+
+class DeletedBlob(BaseModel):
+    """
+    Storage path of a replaced upload, removed later by the purge_blobs command
+
+    Deleting from remote storage inside the request would block the response
+    on a storage round-trip, so views record the path and move on.
+    """
+    path = models.CharField(max_length=255)
+
+    class Meta:
+        verbose_name = "Deleted Blob"
+        verbose_name_plural = "Deleted Blobs"
+
+    def __str__(self):
+        return self.path
+
+    @classmethod
+    def discard(cls, field_file):
+        """Schedule the file behind `field_file` for deletion (immediately if SYNC_BLOB_DELETE)"""
+        if getattr(settings, 'SYNC_BLOB_DELETE', False):
+            field_file.delete(save=False)
+        else:
+            cls.objects.create(path=field_file.name)
+
+
+def copy_audit_entries(entries):
+    """
+    Write unsaved AuditLog instances with PostgreSQL COPY
+
+    Rows are streamed as one CSV payload instead of being bound as INSERT
+    parameters, which is much cheaper for large batches of wide JSON rows.
+    """
+    fields = AuditLog._meta.concrete_fields
+    payload = io.StringIO()
+    writer = csv.writer(payload)
+    for entry in entries:
+        row = []
+        for field in fields:
+            value = field.pre_save(entry, add=True)
+            if value is None:
+                row.append(r'\N')
+            elif isinstance(field, models.JSONField):
+                row.append(json.dumps(value, cls=field.encoder))
+            else:
+                row.append(str(field.get_db_prep_save(value, connection)))
+        writer.writerow(row)
+    payload.seek(0)
+
+    columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+    with connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {AuditLog._meta.db_table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')",
+            payload
+        )
+
+
+class AuditLogBuffer:
+    """
+    Request-scoped buffer of audit entries, written with a single bulk INSERT
+
+    AuditLogMiddleware opens the buffer when a request starts and flushes it once
+    the response is ready. Outside a request (management commands, shell) entries
+    are written immediately. Large batches on PostgreSQL are streamed with COPY.
+
+    Buffered entries are written after the view's own transactions have ended, so
+    unlike a direct create() inside transaction.atomic(), an entry queued by an
+    action that later rolled back is still written; it records the attempt.
+    Entries that can't be written are logged to the kpa_monitoring.audit logger.
+    """
+    BATCH_SIZE = 500
+    COPY_THRESHOLD = 1000
+
+    _local = threading.local()
+
+    @classmethod
+    def start(cls):
+        cls._local.entries = []
+
+    @classmethod
+    def bind_request(cls, request):
+        """Remember the current request so entries can default their user, IP and session"""
+        cls._local.request = request
+        cls._local.request_fields = None
+
+    @classmethod
+    def request_fields(cls):
+        """User, IP and session fields for the bound request, read from it only once"""
+        fields = getattr(cls._local, 'request_fields', None)
+        if fields is None:
+            request = getattr(cls._local, 'request', None)
+            if request is None:
+                return {}
+
+            user = request.user
+            session = getattr(request, 'session', None)
+            fields = {
+                'user': user if user.is_authenticated else None,
+                'user_email': getattr(user, 'email', ''),
+                # Set by ClientIPMiddleware
+                'user_ip_address': getattr(request, 'client_ip', None) or request.META.get('REMOTE_ADDR'),
+                'session_key': session.session_key if session is not None else None,
+            }
+            cls._local.request_fields = fields
+        return fields
+
+    @staticmethod
+    def sampled_out(fields):
+        """Whether a successful entry is dropped by settings.AUDIT_SAMPLE_RATES"""
+        rate = getattr(settings, 'AUDIT_SAMPLE_RATES', {}).get((fields.get('action'), fields.get('model_name')), 1.0)
+        if rate >= 1.0:
+            return False
+        failed = fields.get('object_id') == 'FAILED' or (fields.get('additional_data') or {}).get('status') == 'FAILED'
+        return not failed and random.random() >= rate
+
+    @classmethod
+    def enqueue(cls, **fields):
+        """Queue an entry; user/IP/session default to the bound request's values. Returns None if sampled out."""
+        if cls.sampled_out(fields):
+            return None
+        fields = {**cls.request_fields(), **fields}
+        entries = getattr(cls._local, 'entries', None)
+        if entries is None:
+            return AuditLog.objects.create(**fields)
+
+        entry = AuditLog(**fields)
+        entries.append(entry)
+        return entry
+
+    @classmethod
+    def flush(cls):
+        entries = getattr(cls._local, 'entries', None)
+        cls._local.entries = None
+        cls._local.request = None
+        cls._local.request_fields = None
+        if not entries:
+            return
+        try:
+            if len(entries) >= cls.COPY_THRESHOLD and connection.vendor == 'postgresql':
+                copy_audit_entries(entries)
+            else:
+                AuditLog.objects.bulk_create(entries, batch_size=cls.BATCH_SIZE)
+        except Exception:
+            audit_logger.exception('Could not write %d audit entries; logging them instead', len(entries))
+            for entry in entries:
+                audit_logger.error('Unsaved audit entry: %s', json.dumps(
+                    {field.attname: getattr(entry, field.attname) for field in AuditLog._meta.concrete_fields},
+                    default=str
+                ))
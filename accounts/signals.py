@@ -0,0 +1,79 @@
+"""
+Signal handlers for the accounts app
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import KPA, OperationalPlanItem, OrgUnit, Staff
+from .forms import PROFILE_CHOICES_CACHE_KEY
+from .models import (
+    ADMIN_DEPARTMENTS_CACHE_KEY, DEPARTMENTS_CACHE_KEY, UserProfile, bump_kpa_access_version, display_name,
+    persal_check_cache_key, username_taken_cache_key,
+)
+
+NAME_FIELDS = {'first_name', 'last_name', 'username'}
+
+
+@receiver([post_save, post_delete], sender=OrgUnit)
+@receiver([post_save, post_delete], sender=Staff)
+def clear_profile_choices(sender, **kwargs):
+    """Drop cached profile dropdown choices when their source rows change"""
+    cache.delete(PROFILE_CHOICES_CACHE_KEY)
+
+
+@receiver(post_save, sender=User)
+def sync_profile_full_name(sender, instance, update_fields=None, **kwargs):
+    """Keep UserProfile.full_name_cached in step with the user's name"""
+    if update_fields is not None and not NAME_FIELDS & set(update_fields):
+        return  # e.g. the last_login update on every login
+    name = display_name(instance)
+    if UserProfile.objects.filter(user=instance).exclude(full_name_cached=name).update(full_name_cached=name):
+        UserProfile.forget_permissions(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def clear_cached_permissions(sender, instance, **kwargs):
+    """Drop the cached permission profile whenever the profile row changes"""
+    UserProfile.forget_permissions(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def clear_department_choices(sender, **kwargs):
+    """Drop the cached department filters of the user management page and the admin"""
+    cache.delete_many([DEPARTMENTS_CACHE_KEY, ADMIN_DEPARTMENTS_CACHE_KEY])
+
+
+@receiver([post_save, post_delete], sender=KPA)
+@receiver([post_save, post_delete], sender=OperationalPlanItem)
+@receiver(m2m_changed, sender=OperationalPlanItem.responsible_officers.through)
+def clear_accessible_kpas(sender, **kwargs):
+    """Invalidate every cached accessible-KPA set when ownership or assignments may have changed"""
+    if kwargs.get('action', 'post_').startswith('post_'):
+        bump_kpa_access_version()
+
+
+@receiver([post_save, post_delete], sender=User)
+def clear_username_taken(sender, instance, update_fields=None, **kwargs):
+    """Drop the cached availability answer for this username"""
+    if update_fields is not None and 'username' not in update_fields:
+        return
+    cache.delete(username_taken_cache_key(instance.username))
+
+
+@receiver([post_save, post_delete], sender=Staff)
+def clear_staff_persal_check(sender, instance, **kwargs):
+    """Drop the cached PERSAL check when the staff record changes"""
+    cache.delete(persal_check_cache_key(instance.persal_number))
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def clear_profile_persal_check(sender, instance, **kwargs):
+    """Drop the cached PERSAL checks of the staff record a profile links, and of the one it just unlinked"""
+    staff_ids = {instance.staff_member_id, getattr(instance, '_loaded_staff_member_id', None)} - {None}
+    if staff_ids:
+        for persal in Staff.objects.filter(pk__in=staff_ids).values_list('persal_number', flat=True):
+            cache.delete(persal_check_cache_key(persal))
+    instance._loaded_staff_member_id = instance.staff_member_id
@@ -0,0 +1,43 @@
+"""
+Background tasks for the accounts app
+
+Queued with django_q.tasks.async_task and run by the django-q cluster
+(python manage.py qcluster), so views don't wait on SMTP.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+
+SITE_NAME = 'KPA Performance Monitoring System'
+
+
+def send_password_reset_email(user_id, base_url):
+    """Email a password reset link to the user; `base_url` is the site root, e.g. https://host"""
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None:
+        return
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_url = base_url + reverse('password_reset_confirm', kwargs={'uidb64': uid, 'token': token})
+
+    message = render_to_string('accounts/password_reset_email.html', {
+        'user': user,
+        'reset_url': reset_url,
+        'site_name': SITE_NAME,
+    })
+    send_mail(
+        f'Password Reset - {SITE_NAME}',
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        html_message=message,
+        fail_silently=False,
+    )
@@ -1,3 +1,265 @@
-from django.test import TestCase
+from datetime import date
+from unittest.mock import patch
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.contrib.auth.tokens import default_token_generator
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from accounts.models import DEPARTMENTS_CACHE_KEY, AuditLog, AuditLogBuffer, UserProfile
+from accounts.views import LOGIN_RATE, RESET_CONFIRM_RATE
+from core.models import FinancialYear, KPA, OperationalPlanItem
 
-# Create your tests here.
+
+class AccessibleKpasTests(TestCase):
+    def setUp(self):
+        self.fy = FinancialYear.objects.create(
+            year_code='FY 2024/25',
+            start_date=date(2024, 4, 1),
+            end_date=date(2025, 3, 31),
+            is_active=True,
+        )
+        self.user = User.objects.create_user('pm', password='x', first_name='Prog', last_name='Manager')
+        self.profile = UserProfile.objects.create(
+            user=self.user, job_title='PM', department='D',
+            primary_role='PROGRAMME_MANAGER'
+        )
+        owner = User.objects.create_user('owner', password='x', first_name='O', last_name='Wner')
+        for order in range(3):
+            kpa = KPA.objects.create(
+                title=f'KPA {order}', description='Desc', owner=owner,
+                strategic_objective='SO', financial_year=self.fy, order=order,
+            )
+            OperationalPlanItem.objects.create(
+                kpa=kpa, output='Out', activities=[], target_description='TD',
+                indicator='Ind', inputs=[], input_cost=0, output_cost=0,
+                timeframe='FY', start_date=self.fy.start_date, end_date=self.fy.end_date,
+                budget_programme='Prog', responsible_officer='Prog Manager',
+            )
+
+    def test_listing_accessible_kpas_is_a_single_query(self):
+        with self.assertNumQueries(1):
+            labels = [(str(kpa), kpa.owner.username) for kpa in self.profile.get_accessible_kpas()]
+        self.assertEqual(len(labels), 3)
+
+    def test_elevated_role_listing_is_a_single_query(self):
+        self.profile.primary_role = 'SENIOR_MANAGER'
+        with self.assertNumQueries(1):
+            labels = [(str(kpa), kpa.owner.username) for kpa in self.profile.get_accessible_kpas()]
+        self.assertEqual(len(labels), 3)
+
+
+class UserManagementQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', password='x', first_name='Sys', last_name='Admin')
+        UserProfile.objects.create(
+            user=self.admin, job_title='Admin', department='IT', primary_role='SYSTEM_ADMIN'
+        )
+        self.client.force_login(self.admin)
+
+    def _add_users(self, start, count):
+        for number in range(start, start + count):
+            user = User.objects.create_user(f'user{number}', password='x', first_name='U', last_name=str(number))
+            UserProfile.objects.create(
+                user=user, job_title='Clerk', department='IT', primary_role='ME_STRATEGY',
+                employee_number=f'{number:08d}', line_manager=self.admin
+            )
+
+    def _query_count(self):
+        # Start cold without clearing the whole cache, which also holds the session
+        UserProfile.forget_permissions(self.admin.pk)
+        cache.delete(DEPARTMENTS_CACHE_KEY)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('user_management'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self._add_users(0, 3)
+        baseline = self._query_count()
+        self._add_users(3, 10)
+        self.assertEqual(self._query_count(), baseline)
+
+
+class ResponsibleOfficerSyncTests(TestCase):
+    def setUp(self):
+        fy = FinancialYear.objects.create(
+            year_code='FY 2024/25',
+            start_date=date(2024, 4, 1),
+            end_date=date(2025, 3, 31),
+            is_active=True,
+        )
+        owner = User.objects.create_user('owner', password='x', first_name='O', last_name='Wner')
+        self.kpa = KPA.objects.create(
+            title='KPA', description='Desc', owner=owner,
+            strategic_objective='SO', financial_year=fy, order=1,
+        )
+        self.item = OperationalPlanItem.objects.create(
+            kpa=self.kpa, output='Out', activities=[], target_description='TD',
+            indicator='Ind', inputs=[], input_cost=0, output_cost=0,
+            timeframe='FY', start_date=fy.start_date, end_date=fy.end_date,
+            budget_programme='Prog', responsible_officer='Late Officer',
+        )
+
+    def _profile(self, user):
+        return UserProfile.objects.create(
+            user=user, job_title='PM', department='D', primary_role='PROGRAMME_MANAGER'
+        )
+
+    def test_user_created_after_plan_item_gets_access(self):
+        user = User.objects.create_user('late', password='x', first_name='Late', last_name='Officer')
+        profile = self._profile(user)
+        self.assertTrue(profile.can_edit_plan_item(self.item))
+        self.assertEqual(profile.get_accessible_kpa_ids(), {self.kpa.pk})
+
+    def test_rename_moves_access(self):
+        user = User.objects.create_user('someone', password='x', first_name='Some', last_name='One')
+        profile = self._profile(user)
+        self.assertFalse(profile.can_edit_plan_item(self.item))
+
+        user.first_name, user.last_name = 'Late', 'Officer'
+        user.save(update_fields=['first_name', 'last_name'])
+        self.assertTrue(profile.can_edit_plan_item(self.item))
+
+        user.last_name = 'Other'
+        user.save()
+        self.assertFalse(profile.can_edit_plan_item(self.item))
+
+    def test_save_without_name_change_skips_relink(self):
+        user = User.objects.create_user('late', password='x', first_name='Late', last_name='Officer')
+        user = User.objects.get(pk=user.pk)
+        user.set_password('y')
+        with CaptureQueriesContext(connection) as queries:
+            user.save()
+        self.assertFalse(any('core_operationalplanitem' in query['sql'] for query in queries))
+
+
+LOGIN_RATE_LIMIT = int(LOGIN_RATE.split('/')[0])
+RESET_CONFIRM_RATE_LIMIT = int(RESET_CONFIRM_RATE.split('/')[0])
+
+
+class LoginRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rate limit counters live in the cache
+        User.objects.create_user('pm', password='x')
+
+    def test_web_login_is_throttled_past_the_rate(self):
+        for _ in range(LOGIN_RATE_LIMIT):
+            response = self.client.post(
+                reverse('login'), {'username': 'pm', 'password': 'wrong'}, REMOTE_ADDR='203.0.113.10'
+            )
+            self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            reverse('login'), {'username': 'pm', 'password': 'x'}, REMOTE_ADDR='203.0.113.10'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Too many login attempts', [str(m) for m in response.context['messages']][-1])
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    @override_settings(TRUSTED_PROXIES=None)
+    def test_spoofed_forwarded_for_does_not_reset_the_limit(self):
+        for number in range(LOGIN_RATE_LIMIT):
+            self.client.post(
+                reverse('login'), {'username': 'pm', 'password': 'wrong'},
+                REMOTE_ADDR='203.0.113.13', HTTP_X_FORWARDED_FOR=f'198.51.100.{number}'
+            )
+        response = self.client.post(
+            reverse('login'), {'username': 'pm', 'password': 'x'},
+            REMOTE_ADDR='203.0.113.13', HTTP_X_FORWARDED_FOR='198.51.100.250'
+        )
+        self.assertIn('Too many login attempts', [str(m) for m in response.context['messages']][-1])
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_api_login_issues_tokens_to_anonymous_callers(self):
+        response = self.client.post(
+            reverse('api_login'), {'username': 'pm', 'password': 'x'}, REMOTE_ADDR='203.0.113.12'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.json())
+
+    def test_api_login_returns_429_past_the_rate(self):
+        for _ in range(LOGIN_RATE_LIMIT):
+            self.client.post(
+                reverse('api_login'), {'username': 'pm', 'password': 'wrong'}, REMOTE_ADDR='203.0.113.11'
+            )
+        response = self.client.post(
+            reverse('api_login'), {'username': 'pm', 'password': 'x'}, REMOTE_ADDR='203.0.113.11'
+        )
+        self.assertEqual(response.status_code, 429)
+
+
+class PasswordResetRequestTests(TestCase):
+    def setUp(self):
+        User.objects.create_user('pm', email='pm@example.com', password='x')
+
+    @patch('accounts.views.async_task', side_effect=ConnectionError('broker down'))
+    def test_broker_outage_gives_the_same_redirect(self, mocked_async_task):
+        known = self.client.post(reverse('password_reset'), {'email_or_username': 'pm@example.com'})
+        unknown = self.client.post(reverse('password_reset'), {'email_or_username': 'nobody@example.com'})
+
+        self.assertEqual(mocked_async_task.call_count, 1)
+        self.assertEqual((known.status_code, known.url), (unknown.status_code, unknown.url))
+        self.assertEqual(known.status_code, 302)
+        # Sent directly instead of through the worker
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['pm@example.com'])
+
+
+class PasswordResetConfirmRateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rate limit counters and rejected links live in the cache
+        user = User.objects.create_user('pm', email='pm@example.com', password='x')
+        self.valid_url = reverse('password_reset_confirm', kwargs={
+            'uidb64': urlsafe_base64_encode(force_bytes(user.pk)),
+            'token': default_token_generator.make_token(user),
+        })
+
+    def test_valid_link_is_accepted(self):
+        response = self.client.get(self.valid_url, REMOTE_ADDR='203.0.113.20')
+        self.assertTrue(response.context['validlink'])
+
+    def test_checks_past_the_rate_get_the_invalid_link_page(self):
+        for number in range(RESET_CONFIRM_RATE_LIMIT):
+            url = reverse('password_reset_confirm', kwargs={'uidb64': 'MQ', 'token': f'bad-{number}'})
+            self.client.get(url, REMOTE_ADDR='203.0.113.21')
+        response = self.client.get(self.valid_url, REMOTE_ADDR='203.0.113.21')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['validlink'])
+
+
+class AuditLogBufferFlushTests(TestCase):
+    def test_failed_write_is_logged_with_the_entries(self):
+        AuditLogBuffer.start()
+        AuditLogBuffer.enqueue(action='UPDATE', model_name='KPA', object_id='1', object_repr='KPA 1')
+        with patch.object(AuditLog.objects, 'bulk_create', side_effect=RuntimeError('db down')):
+            with self.assertLogs('kpa_monitoring.audit', 'ERROR') as logs:
+                AuditLogBuffer.flush()
+        self.assertIn('Could not write 1 audit entries', logs.output[0])
+        self.assertIn('KPA 1', logs.output[1])
+        self.assertFalse(AuditLog.objects.exists())
+
+
+@override_settings(AUDIT_SAMPLE_RATES={('LOGIN', 'API_AUTH'): 0.5})
+class ApiLoginAuditSamplingTests(TestCase):
+    def setUp(self):
+        cache.clear()  # Rate limit counters live in the cache
+        User.objects.create_user('pm', password='x')
+
+    def _login(self, password):
+        return self.client.post(
+            reverse('api_login'), {'username': 'pm', 'password': password}, REMOTE_ADDR='203.0.113.30'
+        )
+
+    @patch('accounts.models.random.random', return_value=0.99)
+    def test_successful_login_can_be_sampled_out(self, mocked_random):
+        self.assertEqual(self._login('x').status_code, 200)
+        self.assertFalse(AuditLog.objects.filter(model_name='API_AUTH').exists())
+
+    @patch('accounts.models.random.random', return_value=0.99)
+    def test_failed_login_is_always_kept(self, mocked_random):
+        self.assertEqual(self._login('wrong').status_code, 401)
+        self.assertEqual(AuditLog.objects.filter(model_name='API_AUTH', object_id='FAILED').count(), 1)
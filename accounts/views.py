@@ -3,28 +3,71 @@ Authentication and user management views for KPA Monitoring system
 """
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
+from django.contrib.auth import login, logout, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.contrib.auth.forms import PasswordChangeForm
+from django.contrib.auth.forms import AdminPasswordChangeForm, PasswordChangeForm
+from django.contrib.auth.tokens import default_token_generator
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_http_methods
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.utils.decorators import method_decorator
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode
 from django.views.generic import TemplateView
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import IsAuthenticated
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from django_ratelimit.decorators import ratelimit
+from django_q.tasks import async_task
+from collections import namedtuple
+import hashlib
 import json
-
-from .models import UserProfile, AuditLog
+import logging
+import re
+
+from .auth_cache import authenticate_once
+from .tasks import send_password_reset_email
+from .models import (
+    UserProfile, AuditLog, AuditLogBuffer, DeletedBlob, DEPARTMENTS_CACHE_KEY, DEPARTMENTS_TIMEOUT,
+    AVAILABILITY_CACHE_TIMEOUT, persal_check_cache_key, username_taken_cache_key,
+)
+from .forms import (
+    CustomPasswordChangeForm, CustomPasswordResetForm, CustomSetPasswordForm, DashboardPreferencesForm,
+    ProfilePictureForm, StaffRegistrationForm, UserProfileForm,
+)
+from core.middleware import client_ip_key
+from core.models import Staff
 from core.permissions import require_role
 
+logger = logging.getLogger(__name__)
+
+# Audit log columns shown in activity lists; skips the JSON payload and user agent data
+RECENT_LOG_FIELDS = ('action', 'model_name', 'object_id', 'object_repr', 'timestamp', 'user_ip_address')
+
+# Per-IP limit on login attempts, shared by the web and API login endpoints
+LOGIN_RATE = '10/m'
+
+# Per-IP limit on password reset link checks, and how long a rejected link is remembered
+RESET_CONFIRM_RATE = '20/m'
+RESET_LINK_REJECTED_TIMEOUT = 60
+
+
+def reset_link_rejected_cache_key(uidb64, token):
+    digest = hashlib.blake2b(f'{uidb64}:{token}'.encode(), digest_size=16).hexdigest()
+    return f'accounts:reset_link_rejected:{digest}'
 
+
+@method_decorator(ratelimit(key=client_ip_key, rate=LOGIN_RATE, method='POST', block=False), name='post')
 class LoginView(TemplateView):
     """Custom login view with audit logging"""
     template_name = 'accounts/login.html'
@@ -42,17 +85,21 @@ class LoginView(TemplateView):
             messages.error(request, 'Username and password are required.')
             return self.get(request, *args, **kwargs)
 
-        user = authenticate(request, username=username, password=password)
+        if getattr(request, 'limited', False):
+            messages.error(request, 'Too many login attempts. Please wait a minute and try again.')
+            return self.get(request, *args, **kwargs)
+
+        user = authenticate_once(request, username, password)
 
         if user is not None:
             if user.is_active:
                 login(request, user)
 
                 # Log successful login
-                AuditLog.objects.create(
+                AuditLogBuffer.enqueue(
                     user=user,
                     user_email=user.email,
-                    user_ip_address=self._get_client_ip(request),
+                    user_ip_address=request.client_ip,
                     action='LOGIN',
                     model_name='AUTH',
                     object_id=str(user.id),
@@ -71,10 +118,10 @@ class LoginView(TemplateView):
             messages.error(request, 'Invalid username or password.')
 
             # Log failed login attempt
-            AuditLog.objects.create(
+            AuditLogBuffer.enqueue(
                 user=None,
                 user_email=username,  # Store attempted username
-                user_ip_address=self._get_client_ip(request),
+                user_ip_address=request.client_ip,
                 action='LOGIN',
                 model_name='AUTH',
                 object_id='FAILED',
@@ -85,15 +132,6 @@ class LoginView(TemplateView):
 
         return self.get(request, *args, **kwargs)
 
-    def _get_client_ip(self, request):
-        """Get client IP address"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
-
 
 @login_required
 def logout_view(request):
@@ -101,10 +139,10 @@ def logout_view(request):
     user = request.user
 
     # Log logout
-    AuditLog.objects.create(
+    AuditLogBuffer.enqueue(
         user=user,
         user_email=user.email,
-        user_ip_address=request.META.get('REMOTE_ADDR'),
+        user_ip_address=request.client_ip,
         action='LOGOUT',
         model_name='AUTH',
         object_id=str(user.id),
@@ -120,10 +158,11 @@ def logout_view(request):
 @login_required
 def profile_view(request):
     """Comprehensive user profile view and edit"""
-    from .forms import UserProfileForm, DashboardPreferencesForm, ProfilePictureForm
-
     user_profile, created = UserProfile.objects.get_or_create(user=request.user)
 
+    # A form bound to an invalid submission is rendered as-is, so it keeps its errors
+    profile_form = picture_form = preferences_form = None
+
     # Handle form submissions
     if request.method == 'POST':
         form_type = request.POST.get('form_type')
@@ -157,8 +196,12 @@ def profile_view(request):
                     'email_digest_frequency': preferences_form.cleaned_data['email_digest_frequency'],
                     'theme_preference': preferences_form.cleaned_data['theme_preference'],
                 }
-                user_profile.dashboard_preferences = dashboard_prefs
-                user_profile.save()
+                # Single-column UPDATE: no read-modify-write of the rest of the profile row
+                UserProfile.objects.filter(pk=user_profile.pk).update(
+                    dashboard_preferences=dashboard_prefs,
+                    updated_at=timezone.now()
+                )
+                UserProfile.forget_permissions(request.user.id)
 
                 messages.success(request, 'Dashboard preferences updated successfully.')
                 return redirect('profile')
@@ -170,12 +213,12 @@ def profile_view(request):
 
             if picture_form.is_valid():
                 if picture_form.cleaned_data['profile_picture']:
-                    # Delete old picture if exists
+                    # Old picture is removed from storage later by purge_blobs
                     if user_profile.profile_picture:
-                        user_profile.profile_picture.delete()
+                        DeletedBlob.discard(user_profile.profile_picture)
 
                     user_profile.profile_picture = picture_form.cleaned_data['profile_picture']
-                    user_profile.save()
+                    user_profile.save(update_fields=['profile_picture', 'updated_at'])
 
                     messages.success(request, 'Profile picture updated successfully.')
                 else:
@@ -184,43 +227,44 @@ def profile_view(request):
             else:
                 messages.error(request, 'Please correct the errors in the picture upload.')
 
-    # Initialize forms for GET request
-    profile_form = UserProfileForm(instance=user_profile, user=request.user)
-    picture_form = ProfilePictureForm()
+    # Initialize the forms that weren't submitted
+    if profile_form is None:
+        profile_form = UserProfileForm(instance=user_profile, user=request.user)
+    if picture_form is None:
+        picture_form = ProfilePictureForm()
 
     # Initialize preferences form with current values
-    current_prefs = user_profile.dashboard_preferences or {}
-    preferences_form = DashboardPreferencesForm(initial={
-        'default_view': current_prefs.get('default_view', 'dashboard'),
-        'items_per_page': current_prefs.get('items_per_page', 20),
-        'show_completed': current_prefs.get('show_completed', True),
-        'show_inactive': current_prefs.get('show_inactive', False),
-        'email_digest_frequency': current_prefs.get('email_digest_frequency', 'weekly'),
-        'theme_preference': current_prefs.get('theme_preference', 'light'),
-    })
-
-    # Get user statistics
-    accessible_kpas = user_profile.get_accessible_kpas()
-
-    # Get recent activity
-    recent_logs = []
-    try:
-        recent_logs = AuditLog.objects.filter(
-            user=request.user
-        ).order_by('-timestamp')[:10]
-    except:
-        pass  # AuditLog might not be available
+    if preferences_form is None:
+        current_prefs = user_profile.dashboard_preferences or {}
+        preferences_form = DashboardPreferencesForm(initial={
+            'default_view': current_prefs.get('default_view', 'dashboard'),
+            'items_per_page': current_prefs.get('items_per_page', 20),
+            'show_completed': current_prefs.get('show_completed', True),
+            'show_inactive': current_prefs.get('show_inactive', False),
+            'email_digest_frequency': current_prefs.get('email_digest_frequency', 'weekly'),
+            'theme_preference': current_prefs.get('theme_preference', 'light'),
+        })
+
+    # Get user statistics; the total comes from the cached accessible id set
+    total_accessible_kpas = len(user_profile.get_accessible_kpa_ids())
+    kpa_list = list(user_profile.get_accessible_kpas()[:10]) if total_accessible_kpas else []
+
+    # Get recent activity (just the columns the activity list shows)
+    recent_logs = list(
+        AuditLog.objects.filter(user=request.user)
+        .only(*RECENT_LOG_FIELDS).order_by('-timestamp')[:10]
+    )
 
     context = {
         'user_profile': user_profile,
         'profile_form': profile_form,
         'picture_form': picture_form,
         'preferences_form': preferences_form,
-        'accessible_kpas': accessible_kpas[:10],  # Show first 10
-        'total_accessible_kpas': accessible_kpas.count(),
+        'accessible_kpas': kpa_list,  # Show first 10
+        'total_accessible_kpas': total_accessible_kpas,
         'recent_logs': recent_logs,
         'user_stats': {
-            'kpas_count': accessible_kpas.count(),
+            'kpas_count': total_accessible_kpas,
             'is_manager': user_profile.primary_role in ['SENIOR_MANAGER', 'PROGRAMME_MANAGER'],
             'can_approve': user_profile.can_approve_updates,
             'can_generate_reports': user_profile.can_generate_reports,
@@ -232,8 +276,6 @@ def profile_view(request):
 @login_required
 def change_password_view(request):
     """Change password view with custom form"""
-    from .forms import CustomPasswordChangeForm
-
     if request.method == 'POST':
         form = CustomPasswordChangeForm(request.user, request.POST)
         if form.is_valid():
@@ -241,10 +283,10 @@ def change_password_view(request):
             update_session_auth_hash(request, user)  # Keep user logged in
 
             # Log password change
-            AuditLog.objects.create(
+            AuditLogBuffer.enqueue(
                 user=user,
                 user_email=user.email,
-                user_ip_address=request.META.get('REMOTE_ADDR'),
+                user_ip_address=request.client_ip,
                 action='UPDATE',
                 model_name='AUTH',
                 object_id=str(user.id),
@@ -265,14 +307,11 @@ def change_password_view(request):
 @require_role('SYSTEM_ADMIN', 'SENIOR_MANAGER', 'PROGRAMME_MANAGER', 'ME_STRATEGY')
 def user_management_view(request):
     """Enhanced user management interface for authorized staff"""
-    from django.core.paginator import Paginator
-    from django.db.models import Count, Q
-
-    # Base queryset with related data
-    users = User.objects.select_related('profile').prefetch_related('direct_reports')
+    # Base queryset with related data; direct reports are only counted, never listed
+    users = User.objects.select_related('profile').defer('password')
 
     # Role-based access control - limit what users can see based on their role
-    current_user_profile = getattr(request.user, 'profile', None)
+    current_user_profile = UserProfile.permissions_for(request.user)
     if current_user_profile:
         if current_user_profile.primary_role == 'PROGRAMME_MANAGER':
             # Programme managers can see users in their department/unit and their direct reports
@@ -318,16 +357,20 @@ def user_management_view(request):
     if department_filter:
         users = users.filter(profile__department=department_filter)
 
-    # Search functionality
+    # Search functionality: one subquery per table, so each OR only spans that
+    # table's trigram indexes (see create_indexes) instead of forcing a scan of the join
     if search_query:
-        users = users.filter(
+        matching_users = User.objects.filter(
             Q(username__icontains=search_query) |
             Q(first_name__icontains=search_query) |
             Q(last_name__icontains=search_query) |
-            Q(email__icontains=search_query) |
-            Q(profile__employee_number__icontains=search_query) |
-            Q(profile__job_title__icontains=search_query)
-        )
+            Q(email__icontains=search_query)
+        ).values('pk')
+        matching_profiles = UserProfile.objects.filter(
+            Q(employee_number__icontains=search_query) |
+            Q(job_title__icontains=search_query)
+        ).values('user_id')
+        users = users.filter(Q(pk__in=matching_users) | Q(pk__in=matching_profiles))
 
     # Annotate with additional data
     users = users.annotate(
@@ -339,14 +382,24 @@ def user_management_view(request):
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
 
-    # Get filter options
-    departments = UserProfile.objects.filter(
-        user__is_active=True
-    ).values_list('department', flat=True).distinct().order_by('department')
+    # Get filter options (cached; cleared whenever a profile is saved)
+    departments = cache.get_or_set(
+        DEPARTMENTS_CACHE_KEY,
+        lambda: [
+            department for department in UserProfile.objects.filter(user__is_active=True)
+            .values_list('department', flat=True).distinct().order_by('department')
+            if department
+        ],
+        DEPARTMENTS_TIMEOUT
+    )
 
-    # Statistics
-    total_users = User.objects.filter(is_active=True).count()
-    active_users = User.objects.filter(is_active=True, profile__is_active_user=True).count()
+    # Statistics: both user counts in one conditional aggregate
+    user_counts = User.objects.aggregate(
+        total=Count('id', filter=Q(is_active=True)),
+        active=Count('id', filter=Q(is_active=True, profile__is_active_user=True)),
+    )
+    total_users = user_counts['total']
+    active_users = user_counts['active']
     inactive_users = total_users - active_users
 
     role_stats = UserProfile.objects.filter(
@@ -366,7 +419,7 @@ def user_management_view(request):
     context = {
         'page_obj': page_obj,
         'role_choices': UserProfile.ROLE_CHOICES,
-        'departments': [d for d in departments if d],
+        'departments': departments,
         'current_filters': {
             'status': status_filter,
             'role': role_filter,
@@ -385,14 +438,26 @@ def user_management_view(request):
     return render(request, 'accounts/user_management.html', context)
 
 
+def get_user_with_profile_or_404(user_id):
+    """
+    The user with their profile and linked staff record in one query
+
+    A missing profile comes back as None from the join, so user.profile checks
+    never go back to the database.
+    """
+    return get_object_or_404(User.objects.select_related('profile__staff_member__org_unit'), id=user_id)
+
+
 @require_role('SYSTEM_ADMIN', 'SENIOR_MANAGER', 'PROGRAMME_MANAGER', 'ME_STRATEGY')
 def user_detail_view(request, user_id):
     """User detail view for authorized staff"""
-    user = get_object_or_404(User, id=user_id)
+    user = get_user_with_profile_or_404(user_id)
     user_profile = getattr(user, 'profile', None)
 
     # Get recent audit logs for this user
-    recent_logs = AuditLog.objects.filter(user=user).order_by('-timestamp')[:20]
+    recent_logs = list(
+        AuditLog.objects.filter(user=user).only(*RECENT_LOG_FIELDS).order_by('-timestamp')[:20]
+    )
 
     context = {
         'viewed_user': user,
@@ -402,41 +467,45 @@ def user_detail_view(request, user_id):
     return render(request, 'accounts/user_detail.html', context)
 
 
+EditCapabilities = namedtuple('EditCapabilities', 'edit change_password edit_permissions')
+
+
+def user_edit_capabilities(acting_user, acting_profile, target_user, target_profile):
+    """What acting_user may do to target_user's account, worked out once per request"""
+    if not acting_profile:
+        return EditCapabilities(False, False, False)
+
+    # System admin can edit anyone
+    if acting_profile.primary_role == 'SYSTEM_ADMIN':
+        return EditCapabilities(True, True, True)
+
+    # Users can edit their own profile
+    if acting_user.id == target_user.id:
+        return EditCapabilities(True, True, False)
+
+    # Senior managers can edit their direct reports (compared by id, without loading the manager)
+    if (acting_profile.primary_role == 'SENIOR_MANAGER' and target_profile
+            and target_profile.line_manager_id == acting_user.id):
+        return EditCapabilities(True, True, False)
+
+    # Staff with admin permissions can edit profiles
+    if acting_user.is_staff:
+        return EditCapabilities(True, acting_user.is_superuser, acting_user.is_superuser)
+
+    return EditCapabilities(False, False, False)
+
+
 @login_required
 def admin_edit_user_view(request, user_id):
     """Comprehensive user editing view for authorized users"""
-    from django.contrib.auth.forms import AdminPasswordChangeForm
-    from .forms import UserProfileForm
-
-    user = get_object_or_404(User, id=user_id)
+    user = get_user_with_profile_or_404(user_id)
     user_profile = getattr(user, 'profile', None)
-    current_user_profile = getattr(request.user, 'profile', None)
+    current_user_profile = UserProfile.permissions_for(request.user)
 
     # Check permissions
-    can_edit = False
-    can_change_password = False
-    can_edit_permissions = False
-
-    if current_user_profile:
-        # System admin can edit anyone
-        if current_user_profile.primary_role == 'SYSTEM_ADMIN':
-            can_edit = True
-            can_change_password = True
-            can_edit_permissions = True
-        # Users can edit their own profile
-        elif request.user.id == user.id:
-            can_edit = True
-            can_change_password = True
-        # Senior managers can edit their direct reports
-        elif current_user_profile.primary_role == 'SENIOR_MANAGER' and user_profile and user_profile.line_manager == request.user:
-            can_edit = True
-            can_change_password = True
-        # Staff with admin permissions can edit profiles
-        elif request.user.is_staff:
-            can_edit = True
-            if request.user.is_superuser:
-                can_change_password = True
-                can_edit_permissions = True
+    can_edit, can_change_password, can_edit_permissions = user_edit_capabilities(
+        request.user, current_user_profile, user, user_profile
+    )
 
     if not can_edit:
         messages.error(request, 'You do not have permission to edit this user profile.')
@@ -456,13 +525,16 @@ def admin_edit_user_view(request, user_id):
             user.last_name = request.POST.get('last_name', '')
             user.email = request.POST.get('email', '')
 
+            update_fields = ['first_name', 'last_name', 'email']
+
             # Only allow permission changes for system admins and superusers
             if can_edit_permissions:
                 user.is_active = request.POST.get('is_active') == 'on'
                 user.is_staff = request.POST.get('is_staff') == 'on'
                 user.is_superuser = request.POST.get('is_superuser') == 'on'
+                update_fields += ['is_active', 'is_staff', 'is_superuser']
 
-            user.save()
+            user.save(update_fields=update_fields)
             messages.success(request, f'User information for {user.username} updated successfully.')
 
         elif action == 'update_profile' and can_edit:
@@ -476,7 +548,7 @@ def admin_edit_user_view(request, user_id):
                 # Only allow role changes for system admins
                 if not can_edit_permissions and 'primary_role' in profile_form.cleaned_data:
                     profile.primary_role = user_profile.primary_role  # Keep original role
-                    profile.save()
+                    profile.save(update_fields=['primary_role', 'updated_at'])
 
                 messages.success(request, f'Profile information for {user.username} updated successfully.')
             else:
@@ -492,7 +564,6 @@ def admin_edit_user_view(request, user_id):
             # Change password
             if request.user.id == user.id:
                 # User changing their own password - use regular form
-                from django.contrib.auth.forms import PasswordChangeForm
                 password_form = PasswordChangeForm(user, request.POST)
             else:
                 # Admin changing someone else's password
@@ -514,7 +585,6 @@ def admin_edit_user_view(request, user_id):
     # Initialize password form based on permissions
     if can_change_password:
         if request.user.id == user.id:
-            from django.contrib.auth.forms import PasswordChangeForm
             password_form = PasswordChangeForm(user)
         else:
             password_form = AdminPasswordChangeForm(user)
@@ -543,6 +613,9 @@ def admin_edit_user_view(request, user_id):
 
 # API Views for JWT authentication
 @api_view(['POST'])
+@authentication_classes([])  # A stale session or token must not get in the way of logging in
+@permission_classes([AllowAny])
+@ratelimit(key=client_ip_key, rate=LOGIN_RATE, method='POST', block=False)
 def api_login(request):
     """API login endpoint that returns JWT tokens"""
     username = request.data.get('username')
@@ -554,13 +627,19 @@ def api_login(request):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    user = authenticate(username=username, password=password)
+    if getattr(request, 'limited', False):
+        return Response(
+            {'error': 'Too many login attempts'},
+            status=status.HTTP_429_TOO_MANY_REQUESTS
+        )
+
+    user = authenticate_once(None, username, password)
 
     if user and user.is_active:
         refresh = RefreshToken.for_user(user)
 
         # Get user profile information
-        user_profile = getattr(user, 'profile', None)
+        user_profile = UserProfile.permissions_for(user)
         profile_data = {}
         if user_profile:
             profile_data = {
@@ -571,10 +650,10 @@ def api_login(request):
             }
 
         # Log API login
-        AuditLog.objects.create(
+        AuditLogBuffer.enqueue(
             user=user,
             user_email=user.email,
-            user_ip_address=request.META.get('REMOTE_ADDR'),
+            user_ip_address=request.client_ip,
             action='LOGIN',
             model_name='API_AUTH',
             object_id=str(user.id),
@@ -595,6 +674,18 @@ def api_login(request):
             }
         })
 
+    # Log failed API login attempt (never sampled out)
+    AuditLogBuffer.enqueue(
+        user=None,
+        user_email=username,  # Store attempted username
+        user_ip_address=request.client_ip,
+        action='LOGIN',
+        model_name='API_AUTH',
+        object_id='FAILED',
+        object_repr=f"Failed API login attempt for {username}",
+        additional_data={'method': 'JWT', 'status': 'FAILED'}
+    )
+
     return Response(
         {'error': 'Invalid credentials'},
         status=status.HTTP_401_UNAUTHORIZED
@@ -612,10 +703,10 @@ def api_logout(request):
             token.blacklist()
 
         # Log API logout
-        AuditLog.objects.create(
+        AuditLogBuffer.enqueue(
             user=request.user,
             user_email=request.user.email,
-            user_ip_address=request.META.get('REMOTE_ADDR'),
+            user_ip_address=request.client_ip,
             action='LOGOUT',
             model_name='API_AUTH',
             object_id=str(request.user.id),
@@ -631,12 +722,17 @@ def api_logout(request):
         )
 
 
+API_PROFILE_FIELDS = (
+    'employee_number', 'job_title', 'department', 'primary_role', 'phone_number', 'mobile_number',
+    'can_view_all_kpas', 'can_approve_updates', 'can_generate_reports', 'dashboard_preferences',
+)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def api_profile(request):
     """API endpoint to get user profile information"""
     user = request.user
-    user_profile = getattr(user, 'profile', None)
 
     profile_data = {
         'id': user.id,
@@ -649,28 +745,16 @@ def api_profile(request):
         'last_login': user.last_login,
     }
 
-    if user_profile:
-        profile_data.update({
-            'employee_number': user_profile.employee_number,
-            'job_title': user_profile.job_title,
-            'department': user_profile.department,
-            'primary_role': user_profile.primary_role,
-            'phone_number': user_profile.phone_number,
-            'mobile_number': user_profile.mobile_number,
-            'can_view_all_kpas': user_profile.can_view_all_kpas,
-            'can_approve_updates': user_profile.can_approve_updates,
-            'can_generate_reports': user_profile.can_generate_reports,
-            'dashboard_preferences': user_profile.dashboard_preferences,
-        })
+    # The user row is already loaded by authentication; fetch just the profile columns returned
+    profile_row = UserProfile.objects.filter(user=user).values(*API_PROFILE_FIELDS).first()
+    if profile_row:
+        profile_data.update(profile_row)
 
     return Response(profile_data)
 
 
 def register_view(request):
     """Staff member registration view"""
-    from .forms import StaffRegistrationForm
-    from django.db import transaction
-
     if request.user.is_authenticated:
         return redirect('dashboard')
 
@@ -686,34 +770,22 @@ def register_view(request):
                     persal_number = form.cleaned_data.get('persal_number')
                     if persal_number:
                         try:
-                            from core.models import Staff
-                            staff_member = Staff.objects.get(
+                            staff_member = Staff.objects.select_related('org_unit').get(
                                 persal_number=persal_number,
                                 is_active=True
                             )
 
-                            # Create or update profile
-                            profile, created = UserProfile.objects.get_or_create(
+                            # The user was just created, so there is no profile to look up or update
+                            UserProfile.objects.create(
                                 user=user,
-                                defaults={
-                                    'staff_member': staff_member,
-                                    'employee_number': staff_member.persal_number,
-                                    'job_title': staff_member.job_title,
-                                    'department': staff_member.org_unit.name,
-                                    'unit_subdirectorate': staff_member.org_unit.name,
-                                    'primary_role': get_role_from_title(staff_member.job_title),
-                                }
+                                staff_member=staff_member,
+                                employee_number=staff_member.persal_number,
+                                job_title=staff_member.job_title,
+                                department=staff_member.org_unit.name,
+                                unit_subdirectorate=staff_member.org_unit.name,
+                                primary_role=get_role_from_title(staff_member.job_title),
                             )
 
-                            if not created:
-                                profile.staff_member = staff_member
-                                profile.employee_number = staff_member.persal_number
-                                profile.job_title = staff_member.job_title
-                                profile.department = staff_member.org_unit.name
-                                profile.unit_subdirectorate = staff_member.org_unit.name
-                                profile.primary_role = get_role_from_title(staff_member.job_title)
-                                profile.save()
-
                             messages.success(
                                 request,
                                 f"Account created successfully! You are registered as {staff_member.job_title} "
@@ -721,7 +793,7 @@ def register_view(request):
                             )
                         except Staff.DoesNotExist:
                             # Create basic profile without staff link
-                            UserProfile.objects.get_or_create(user=user)
+                            UserProfile.objects.create(user=user)
                             messages.warning(
                                 request,
                                 "Account created, but PERSAL number not found in staff records. "
@@ -729,95 +801,61 @@ def register_view(request):
                             )
                     else:
                         # Create basic profile
-                        UserProfile.objects.get_or_create(user=user)
+                        UserProfile.objects.create(user=user)
                         messages.success(request, "Account created successfully!")
 
-                    # Auto-login the user
-                    login(request, user)
-                    return redirect('dashboard')
-
             except Exception as e:
                 messages.error(request, f"Registration failed: {str(e)}")
+            else:
+                # Auto-login the user once the account is committed, so the session
+                # write doesn't extend the transaction holding the new user/profile rows
+                login(request, user)
+                return redirect('dashboard')
     else:
         form = StaffRegistrationForm()
 
     return render(request, 'accounts/register.html', {'form': form})
 
 
+def queue_password_reset_email(user_id, base_url):
+    """
+    Hand the reset email to the django-q worker, or send it here if the broker is down
+
+    Never raises: an error only for existing accounts would reveal which ones exist.
+    """
+    try:
+        async_task('accounts.tasks.send_password_reset_email', user_id, base_url)
+        return
+    except Exception:
+        logger.exception('Could not queue the password reset email; sending it directly')
+    try:
+        send_password_reset_email(user_id, base_url)
+    except Exception:
+        logger.exception('Could not send the password reset email')
+
+
 def password_reset_view(request):
     """Password reset request view"""
-    from .forms import CustomPasswordResetForm
-    from django.core.mail import send_mail
-    from django.conf import settings
-    from django.urls import reverse
-    from django.utils.http import urlsafe_base64_encode
-    from django.utils.encoding import force_bytes
-    from django.contrib.auth.tokens import default_token_generator
-    from django.template.loader import render_to_string
-
     if request.method == 'POST':
         form = CustomPasswordResetForm(request.POST)
         if form.is_valid():
             # Get user by email or username
             identifier = form.cleaned_data['email_or_username']
 
-            user = None
-            if '@' in identifier:
-                # Email provided
-                try:
-                    user = User.objects.get(email=identifier, is_active=True)
-                except User.DoesNotExist:
-                    pass
-            else:
-                # Username provided
-                try:
-                    user = User.objects.get(username=identifier, is_active=True)
-                except User.DoesNotExist:
-                    pass
+            # One query whatever the input looks like; only the id is handed to the task
+            user = User.objects.filter(
+                Q(email=identifier) | Q(username=identifier), is_active=True
+            ).only('id').first()
 
             if user:
-                # Generate reset token
-                token = default_token_generator.make_token(user)
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
+                queue_password_reset_email(user.id, request.build_absolute_uri('/').rstrip('/'))
 
-                # Create reset URL
-                reset_url = request.build_absolute_uri(
-                    reverse('password_reset_confirm', kwargs={'uidb64': uid, 'token': token})
-                )
-
-                # Send email
-                subject = 'Password Reset - KPA Performance Monitoring System'
-                message = render_to_string('accounts/password_reset_email.html', {
-                    'user': user,
-                    'reset_url': reset_url,
-                    'site_name': 'KPA Performance Monitoring System',
-                })
-
-                try:
-                    send_mail(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [user.email],
-                        html_message=message,
-                        fail_silently=False,
-                    )
-                    messages.success(
-                        request,
-                        "Password reset instructions have been sent to your email address."
-                    )
-                except Exception as e:
-                    messages.error(
-                        request,
-                        "Failed to send password reset email. Please contact your administrator."
-                    )
-            else:
-                # Don't reveal whether user exists or not
-                messages.success(
-                    request,
-                    "If an account with that email/username exists, "
-                    "password reset instructions have been sent."
-                )
+            # Same response either way: don't reveal whether the user exists
+            messages.success(
+                request,
+                "If an account with that email/username exists, "
+                "password reset instructions have been sent."
+            )
 
             return redirect('login')
     else:
@@ -826,16 +864,23 @@ def password_reset_view(request):
     return render(request, 'accounts/password_reset.html', {'form': form})
 
 
+@ratelimit(key=client_ip_key, rate=RESET_CONFIRM_RATE, block=False)
 def password_reset_confirm_view(request, uidb64, token):
     """Password reset confirmation view"""
-    from .forms import CustomSetPasswordForm
-    from django.utils.http import urlsafe_base64_decode
-    from django.utils.encoding import force_str
-    from django.contrib.auth.tokens import default_token_generator
+    # Links already rejected (or probes over the rate limit) are answered without the DB
+    rejected_key = reset_link_rejected_cache_key(uidb64, token)
+    if getattr(request, 'limited', False) or cache.get(rejected_key):
+        return render(request, 'accounts/password_reset_confirm.html', {
+            'validlink': False,
+        })
 
     try:
         uid = force_str(urlsafe_base64_decode(uidb64))
-        user = User.objects.get(pk=uid)
+        # The token hash covers pk, password, last_login and email; the password
+        # similarity validator reads the name fields
+        user = User.objects.only(
+            'password', 'last_login', 'is_active', 'email', 'username', 'first_name', 'last_name'
+        ).get(pk=uid)
     except (TypeError, ValueError, OverflowError, User.DoesNotExist):
         user = None
 
@@ -855,9 +900,9 @@ def password_reset_confirm_view(request, uidb64, token):
         return render(request, 'accounts/password_reset_confirm.html', {
             'form': form,
             'validlink': True,
-            'user': user,
         })
     else:
+        cache.set(rejected_key, True, RESET_LINK_REJECTED_TIMEOUT)
         return render(request, 'accounts/password_reset_confirm.html', {
             'validlink': False,
         })
@@ -874,7 +919,14 @@ def check_username_availability(request):
     if len(username) < 3:
         return JsonResponse({'available': False, 'message': 'Username must be at least 3 characters'})
 
-    if User.objects.filter(username=username).exists():
+    # Called on every keystroke; cleared by a signal when a user with this name is saved
+    key = username_taken_cache_key(username)
+    taken = cache.get(key)
+    if taken is None:
+        taken = User.objects.filter(username=username).exists()
+        cache.set(key, taken, AVAILABILITY_CACHE_TIMEOUT)
+
+    if taken:
         return JsonResponse({'available': False, 'message': 'Username is already taken'})
 
     return JsonResponse({'available': True, 'message': 'Username is available'})
@@ -883,52 +935,62 @@ def check_username_availability(request):
 @require_http_methods(["GET"])
 def check_persal_validity(request):
     """AJAX endpoint to check PERSAL number validity"""
-    from core.models import Staff
-
     persal = request.GET.get('persal', '').strip()
 
     if not persal:
         return JsonResponse({'valid': False, 'message': 'PERSAL number is required'})
 
+    result = cache.get_or_set(
+        persal_check_cache_key(persal), lambda: persal_check_result(persal), AVAILABILITY_CACHE_TIMEOUT
+    )
+    return JsonResponse(result)
+
+
+def persal_check_result(persal):
+    """Response payload for check_persal_validity"""
     try:
-        staff_member = Staff.objects.get(persal_number=persal, is_active=True)
-
-        # Check if already linked to a user
-        if hasattr(staff_member, 'user_profile') and staff_member.user_profile:
-            return JsonResponse({
-                'valid': False,
-                'message': 'This PERSAL number is already linked to another account'
-            })
-
-        return JsonResponse({
-            'valid': True,
-            'message': 'Valid PERSAL number',
-            'staff_info': {
-                'name': staff_member.full_name,
-                'job_title': staff_member.job_title,
-                'unit': staff_member.org_unit.name,
-            }
-        })
+        # Only the columns reported below, not the whole (wide) staff row, and
+        # whether a profile is linked, all in one query
+        staff_member = Staff.objects.select_related('org_unit').only(
+            'first_name', 'last_name', 'job_title', 'org_unit__name'
+        ).annotate(
+            has_profile=Exists(UserProfile.objects.filter(staff_member=OuterRef('pk')))
+        ).get(persal_number=persal, is_active=True)
     except Staff.DoesNotExist:
-        return JsonResponse({
+        return {
             'valid': False,
             'message': 'PERSAL number not found in staff records'
-        })
+        }
+
+    # Check if already linked to a user
+    if staff_member.has_profile:
+        return {
+            'valid': False,
+            'message': 'This PERSAL number is already linked to another account'
+        }
+
+    return {
+        'valid': True,
+        'message': 'Valid PERSAL number',
+        'staff_info': {
+            'name': staff_member.full_name,
+            'job_title': staff_member.job_title,
+            'unit': staff_member.org_unit.name,
+        }
+    }
+
+
+# Job title fragments per role, one alternation per tier; the first tier that matches wins
+ROLE_TITLE_PATTERNS = (
+    (re.compile(r'CEO|DIRECTOR-GENERAL|CHIEF DIRECTOR|DIRECTOR:'), 'SENIOR_MANAGER'),
+    (re.compile(r'DD:|DEPUTY DIRECTOR|ASD:|ASSISTANT DIRECTOR'), 'PROGRAMME_MANAGER'),
+)
 
 
 def get_role_from_title(job_title):
     """Determine user role based on job title"""
     title_upper = job_title.upper()
-
-    if 'CEO' in title_upper or 'DIRECTOR-GENERAL' in title_upper:
-        return 'SENIOR_MANAGER'
-    elif 'CHIEF DIRECTOR' in title_upper or 'DIRECTOR:' in title_upper:
-        return 'SENIOR_MANAGER'
-    elif 'DD:' in title_upper or 'DEPUTY DIRECTOR' in title_upper:
-        return 'PROGRAMME_MANAGER'
-    elif 'ASD:' in title_upper or 'ASSISTANT DIRECTOR' in title_upper:
-        return 'PROGRAMME_MANAGER'
-    elif 'SAO:' in title_upper or 'SENIOR ADMINISTRATIVE' in title_upper:
-        return 'ME_STRATEGY'
-    else:
-        return 'ME_STRATEGY'  # Default role for other staff
+    for pattern, role in ROLE_TITLE_PATTERNS:
+        if pattern.search(title_upper):
+            return role
+    return 'ME_STRATEGY'  # SAO and all other staff
@@ -3,10 +3,13 @@ Admin configuration for core models
 """
 
 from django.contrib import admin
+from django.core.cache import cache
 from django.utils.html import format_html
 from .models import OrgUnit
 
 from .models import FinancialYear, KPA, OperationalPlanItem, Staff
+from accounts.models import bump_kpa_access_version
+from .forms import MANAGER_CHOICES_CACHE_KEY
 
 
 @admin.register(FinancialYear)
@@ -54,6 +57,7 @@ class OrgUnitAdmin(admin.ModelAdmin):
 class KPAAdmin(admin.ModelAdmin):
     list_display = ['title', 'financial_year', 'owner', 'get_org_units', 'order', 'is_active']
     list_filter = ['financial_year', 'is_active', 'owner', 'org_units']
+    list_select_related = ['financial_year', 'owner']
     search_fields = ['title', 'description', 'strategic_objective']
     readonly_fields = ['id', 'created_at', 'updated_at', 'created_by', 'updated_by']
     ordering = ['financial_year', 'order', 'title']
@@ -77,26 +81,32 @@ class KPAAdmin(admin.ModelAdmin):
         }),
     )
 
+    def get_queryset(self, request):
+        # Org units are prefetched once for the page instead of queried per row
+        return super().get_queryset(request).prefetch_related('org_units')
+
     def get_org_units(self, obj):
         """Display org units in list view"""
-        units = obj.org_units.all()[:3]  # Show first 3
+        units = list(obj.org_units.all())  # Served from the prefetch
         if not units:
             return "—"
-        result = ", ".join([unit.name for unit in units])
-        if obj.org_units.count() > 3:
-            result += f" (+{obj.org_units.count() - 3} more)"
+        result = ", ".join([unit.name for unit in units[:3]])  # Show first 3
+        if len(units) > 3:
+            result += f" (+{len(units) - 3} more)"
         return result
     get_org_units.short_description = 'Organizational Units'
 
     def make_active(self, request, queryset):
         """Bulk action to activate KPAs"""
         updated = queryset.update(is_active=True)
+        bump_kpa_access_version()
         self.message_user(request, f'{updated} KPA(s) marked as active.')
     make_active.short_description = 'Mark selected KPAs as active'
 
     def make_inactive(self, request, queryset):
         """Bulk action to deactivate KPAs"""
         updated = queryset.update(is_active=False)
+        bump_kpa_access_version()
         self.message_user(request, f'{updated} KPA(s) marked as inactive.')
     make_inactive.short_description = 'Mark selected KPAs as inactive'
 
@@ -111,6 +121,7 @@ class KPAAdmin(admin.ModelAdmin):
 class StaffAdmin(admin.ModelAdmin):
     list_display = ['persal_number', 'full_name', 'job_title', 'org_unit', 'cell_number', 'extension', 'employment_type', 'is_active', 'start_date']
     list_filter = ['org_unit', 'employment_type', 'salary_level', 'is_active', 'gender', 'highest_qualification', 'is_manager']
+    list_select_related = ['org_unit']
     search_fields = ['persal_number', 'first_name', 'last_name', 'email', 'job_title', 'cell_number', 'phone']
     readonly_fields = ['id', 'created_at', 'updated_at', 'created_by', 'updated_by', 'years_of_service', 'is_contract_ending_soon']
     list_editable = ['is_active']
@@ -154,16 +165,19 @@ class StaffAdmin(admin.ModelAdmin):
 
     def make_active(self, request, queryset):
         updated = queryset.update(is_active=True)
+        cache.delete(MANAGER_CHOICES_CACHE_KEY)
         self.message_user(request, f'{updated} staff member(s) marked as active.')
     make_active.short_description = 'Mark selected staff as active'
 
     def make_inactive(self, request, queryset):
         updated = queryset.update(is_active=False)
+        cache.delete(MANAGER_CHOICES_CACHE_KEY)
         self.message_user(request, f'{updated} staff member(s) marked as inactive.')
     make_inactive.short_description = 'Mark selected staff as inactive'
 
     def mark_as_managers(self, request, queryset):
         updated = queryset.update(is_manager=True)
+        cache.delete(MANAGER_CHOICES_CACHE_KEY)
         self.message_user(request, f'{updated} staff member(s) marked as managers.')
     mark_as_managers.short_description = 'Mark selected staff as managers'
 
@@ -184,6 +198,7 @@ class OperationalPlanItemAdmin(admin.ModelAdmin):
         'kpa__financial_year', 'kpa', 'priority', 'is_active',
         'budget_programme', 'budget_objective'
     ]
+    list_select_related = ['kpa__financial_year']
     search_fields = [
         'output', 'indicator', 'responsible_officer',
         'budget_programme', 'budget_objective', 'unit_subdirectorate'
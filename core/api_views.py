@@ -1,3 +1,5 @@
+from datetime import datetime
+
 from rest_framework import viewsets, permissions, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -6,7 +8,7 @@ from django.utils import timezone
 from .models import FinancialYear, KPA, OperationalPlanItem
 from .api_serializers import FinancialYearSerializer, KPASerializer, OperationalPlanItemSerializer
 from progress.models import Target, ProgressUpdate
-from progress.api_serializers import TargetSerializer, ProgressUpdateSerializer
+from progress.api_serializers import TargetSerializer, ProgressUpdateSerializer, DraftProgressUpdateSerializer
 from core.utils_time import is_period_locked
 
 
@@ -22,13 +24,14 @@ class FinancialYearViewSet(viewsets.ModelViewSet):
 
 
 class KPAViewSet(viewsets.ModelViewSet):
-    queryset = KPA.objects.all()
+    queryset = KPA.objects.select_related('financial_year')
     serializer_class = KPASerializer
     permission_classes = [IsAuthenticatedRBAC]
 
 
 class OperationalPlanItemViewSet(viewsets.ModelViewSet):
-    queryset = OperationalPlanItem.objects.all()
+    # The serializer nests the KPA and its financial year
+    queryset = OperationalPlanItem.objects.select_related('kpa__financial_year')
     serializer_class = OperationalPlanItemSerializer
     permission_classes = [IsAuthenticatedRBAC]
     filterset_fields = ['kpa', 'unit_subdirectorate', 'is_active']
@@ -56,7 +59,11 @@ class ProgressUpdateViewSet(viewsets.ModelViewSet):
         """
         try:
             target_id = request.data.get('target') or request.data.get('target_id')
-            target = get_object_or_404(Target, id=target_id)
+            # Permission and quarter-lock checks below walk plan_item -> kpa -> financial_year/owner
+            target = get_object_or_404(
+                Target.objects.select_related('plan_item__kpa__financial_year', 'plan_item__kpa__owner'),
+                id=target_id
+            )
         except Exception:
             return Response({'error': 'Target is required.'}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -70,7 +77,6 @@ class ProgressUpdateViewSet(viewsets.ModelViewSet):
         try:
             period_end = request.data.get('period_end')
             if period_end:
-                from datetime import datetime
                 period_end_dt = datetime.fromisoformat(period_end).date()
                 if is_period_locked(fin_year, period_end_dt):
                     return Response({'error': 'Quarter is locked for this period.'}, status=status.HTTP_423_LOCKED)
@@ -78,26 +84,8 @@ class ProgressUpdateViewSet(viewsets.ModelViewSet):
             pass
 
         # Upsert by composite
-        # Normalize incoming data to a plain dict (avoid QueryDict quirks)
-        raw = request.data
-        try:
-            from django.http import QueryDict
-            if isinstance(raw, QueryDict):
-                payload = {k: raw.get(k) for k in raw.keys()}
-            else:
-                payload = dict(raw)
-        except Exception:
-            payload = dict(raw)
-
-        # evidence_urls handling: accept textarea text or array
-        ev = payload.get('evidence_urls')
-        if isinstance(ev, str):
-            payload['evidence_urls'] = [l.strip() for l in ev.splitlines() if l.strip()]
-        elif isinstance(ev, list):
-            payload['evidence_urls'] = [str(l).strip() for l in ev if str(l).strip()]
-
-        payload['is_submitted'] = False
-        ser = ProgressUpdateSerializer(data=payload)
+        # The target is already loaded and checked above, so the serializer takes it as read-only
+        ser = DraftProgressUpdateSerializer(data=request.data)
         if not ser.is_valid():
             return Response({'errors': ser.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -118,7 +106,7 @@ class ProgressUpdateViewSet(viewsets.ModelViewSet):
             out = ProgressUpdateSerializer(existing)
             return Response({'ok': True, 'id': existing.id, 'saved': timezone.now().isoformat(), 'data': out.data})
         else:
-            obj = ser.save(created_by=request.user, updated_by=request.user)
+            obj = ser.save(target=target, created_by=request.user, updated_by=request.user)
             out = ProgressUpdateSerializer(obj)
             return Response({'ok': True, 'id': obj.id, 'saved': timezone.now().isoformat(), 'data': out.data})
 
@@ -1,5 +1,6 @@
 from django import forms
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from .models import OperationalPlanItem, KPA, FinancialYear, OrgUnit
 
 
@@ -17,6 +18,27 @@ class GroupedManagerSelect(forms.Select):
         return option
 
 
+def bootstrap_widgets(form_class):
+    """
+    Class decorator adding Bootstrap classes to every declared field's widget
+
+    Done once at import on base_fields; each form instance gets its own copy of
+    the widgets (and their attrs) from there.
+    """
+    for field in form_class.base_fields.values():
+        widget = field.widget
+        if isinstance(widget, (forms.Select, forms.SelectMultiple)):
+            extra = 'form-select js-choices'
+        elif isinstance(widget, forms.DateInput):
+            extra = 'form-control js-date'
+        else:
+            extra = 'form-control'
+        css = widget.attrs.get('class', '')
+        widget.attrs['class'] = (css + ' ' + extra).strip()
+    return form_class
+
+
+@bootstrap_widgets
 class OperationalPlanItemForm(forms.ModelForm):
     class Meta:
         model = OperationalPlanItem
@@ -43,6 +65,8 @@ class OperationalPlanItemForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'rows': 2}),
             'start_date': forms.DateInput(attrs={'type': 'date'}),
             'end_date': forms.DateInput(attrs={'type': 'date'}),
+            'input_cost': forms.NumberInput(attrs={'placeholder': '0.00', 'data-currency': 'zar'}),
+            'output_cost': forms.NumberInput(attrs={'placeholder': '0.00', 'data-currency': 'zar'}),
         }
 
     def __init__(self, *args, **kwargs):
@@ -50,22 +74,71 @@ class OperationalPlanItemForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         if financial_year is not None:
             self.fields['kpa'].queryset = KPA.objects.filter(financial_year=financial_year, is_active=True).order_by('order', 'title')
-        # Set Bootstrap classes
-        for name, field in self.fields.items():
-            widget = field.widget
-            if isinstance(widget, (forms.Select, forms.SelectMultiple)):
-                css = widget.attrs.get('class', '')
-                widget.attrs['class'] = (css + ' form-select js-choices').strip()
-            elif isinstance(widget, forms.DateInput):
-                css = widget.attrs.get('class', '')
-                widget.attrs['class'] = (css + ' form-control js-date').strip()
-            else:
-                css = widget.attrs.get('class', '')
-                widget.attrs['class'] = (css + ' form-control').strip()
-        self.fields['input_cost'].widget.attrs.update({'placeholder': '0.00', 'data-currency': 'zar'})
-        self.fields['output_cost'].widget.attrs.update({'placeholder': '0.00', 'data-currency': 'zar'})
 
 
+MANAGER_CHOICES_CACHE_KEY = 'core:kpa_form:manager_choices'
+FORM_CHOICES_TIMEOUT = 3600
+
+
+def build_manager_choices():
+    """
+    (ids, choices) for the KPA owner field: active managers grouped by org unit
+
+    Cached under MANAGER_CHOICES_CACHE_KEY; core.signals clears it when staff,
+    profiles, manager users or org units change.
+    """
+    manager_users = User.objects.filter(
+        profile__staff_member__is_manager=True,
+        profile__staff_member__is_active=True,
+        is_active=True
+    ).select_related('profile__staff_member__org_unit').order_by(
+        'profile__staff_member__org_unit__name',
+        'first_name',
+        'last_name'
+    )
+
+    ids = []
+    choices = [('', 'Select a manager...')]
+    current_unit = None
+    for user in manager_users:
+        staff = user.profile.staff_member
+        unit_name = staff.org_unit.name
+
+        # Add unit separator if this is a new unit
+        if current_unit != unit_name:
+            if current_unit is not None:
+                choices.append(('', '─' * 50))  # Separator
+            current_unit = unit_name
+
+        # Format: "Full Name (Job Title) - Unit Name"
+        ids.append(user.id)
+        choices.append((user.id, f"{user.get_full_name()} ({staff.job_title}) - {unit_name}"))
+
+    return ids, (choices if ids else None)
+
+
+ORG_UNIT_CHOICES_CACHE_KEY = 'core:kpa_form:org_unit_choices'
+
+
+def build_org_unit_choices():
+    """
+    (ids, choices) for the KPA org units field: active units grouped by unit type
+
+    Cached under ORG_UNIT_CHOICES_CACHE_KEY; core.signals clears it when org units change.
+    """
+    units = OrgUnit.objects.filter(is_active=True).order_by('unit_type', 'name').values_list(
+        'id', 'unit_type', 'name'
+    )
+    type_labels = dict(OrgUnit.UNIT_TYPE_CHOICES)
+    ids = []
+    grouped = {}
+    for unit_id, unit_type, name in units:
+        ids.append(unit_id)
+        grouped.setdefault(unit_type, []).append((unit_id, name))
+    return ids, [(type_labels[t], opts) for t, opts in grouped.items()]
+
+
+@bootstrap_widgets
 class KPAForm(forms.ModelForm):
     class Meta:
         model = KPA
@@ -82,66 +155,20 @@ class KPAForm(forms.ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-        # Filter owner field to show only managers (staff members with is_manager=True)
-        from django.contrib.auth.models import User
-        from accounts.models import UserProfile
-
-        # Get users who are linked to staff members marked as managers
-        manager_users = User.objects.filter(
-            profile__staff_member__is_manager=True,
-            profile__staff_member__is_active=True,
-            is_active=True
-        ).select_related('profile__staff_member').order_by(
-            'profile__staff_member__org_unit__name',
-            'first_name',
-            'last_name'
+        # Owner must be a manager (staff member with is_manager=True); choices are grouped by unit
+        manager_ids, manager_choices = cache.get_or_set(
+            MANAGER_CHOICES_CACHE_KEY, build_manager_choices, FORM_CHOICES_TIMEOUT
         )
-
-        self.fields['owner'].queryset = manager_users
+        self.fields['owner'].queryset = User.objects.filter(id__in=manager_ids)
         self.fields['owner'].empty_label = "Select a manager..."
+        if manager_choices:
+            self.fields['owner'].widget.choices = manager_choices
 
-        # Customize the display of manager options to show organizational context
-        if manager_users.exists():
-            choices = [('', 'Select a manager...')]
-            current_unit = None
-
-            for user in manager_users:
-                staff = user.profile.staff_member
-                unit_name = staff.org_unit.name
-
-                # Add unit separator if this is a new unit
-                if current_unit != unit_name:
-                    if current_unit is not None:
-                        choices.append(('', '─' * 50))  # Separator
-                    current_unit = unit_name
-
-                # Format: "Full Name (Job Title) - Unit Name"
-                display_name = f"{user.get_full_name()} ({staff.job_title}) - {unit_name}"
-                choices.append((user.id, display_name))
-
-            self.fields['owner'].widget.choices = choices
-
-        # Widget classes
-        for name, field in self.fields.items():
-            w = field.widget
-            if isinstance(w, (forms.Select, forms.SelectMultiple)):
-                css = w.attrs.get('class', '')
-                w.attrs['class'] = (css + ' form-select js-choices').strip()
-            elif isinstance(w, forms.Textarea):
-                css = w.attrs.get('class', '')
-                w.attrs['class'] = (css + ' form-control').strip()
-            else:
-                css = w.attrs.get('class', '')
-                w.attrs['class'] = (css + ' form-control').strip()
         # Org units queryset and grouped choices by type
-        qs = OrgUnit.objects.filter(is_active=True).order_by('unit_type', 'name')
-        self.fields['org_units'].queryset = qs
-        type_labels = dict(OrgUnit.UNIT_TYPE_CHOICES)
-        grouped = {}
-        for u in qs:
-            grouped.setdefault(u.unit_type, []).append((u.id, u.name))
-        self.fields['org_units'].choices = [
-            (type_labels[t], opts) for t, opts in grouped.items()
-        ]
+        org_unit_ids, org_unit_choices = cache.get_or_set(
+            ORG_UNIT_CHOICES_CACHE_KEY, build_org_unit_choices, FORM_CHOICES_TIMEOUT
+        )
+        self.fields['org_units'].queryset = OrgUnit.objects.filter(id__in=org_unit_ids)
+        self.fields['org_units'].choices = org_unit_choices
         self.fields['org_units'].help_text = "Assign one or more organizational units (Chief Directorates, Directorates, Sub-Directorates)"
 
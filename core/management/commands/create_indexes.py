@@ -54,6 +54,9 @@ class Command(BaseCommand):
                 "CREATE INDEX IF NOT EXISTS idx_costline_period ON progress_costline(cost_period_start, cost_period_end);",
                 "CREATE INDEX IF NOT EXISTS idx_costline_active ON progress_costline(is_active) WHERE is_active = true;",
                 
+                # auth_user email lookups (profile/registration uniqueness checks, password reset)
+                "CREATE INDEX IF NOT EXISTS idx_user_email ON auth_user(email);",
+
                 # UserProfile indexes
                 "CREATE INDEX IF NOT EXISTS idx_userprofile_role ON accounts_userprofile(primary_role);",
                 "CREATE INDEX IF NOT EXISTS idx_userprofile_department ON accounts_userprofile(department);",
@@ -62,7 +65,7 @@ class Command(BaseCommand):
                 
                 # AuditLog indexes (already defined in model but ensuring they exist)
                 "CREATE INDEX IF NOT EXISTS idx_auditlog_user_timestamp ON accounts_auditlog(user_id, timestamp);",
-                "CREATE INDEX IF NOT EXISTS idx_auditlog_model_object ON accounts_auditlog(model_name, object_id);",
+                "CREATE INDEX IF NOT EXISTS idx_auditlog_model_object ON accounts_auditlog(model_name, object_id, timestamp DESC);",
                 "CREATE INDEX IF NOT EXISTS idx_auditlog_action_timestamp ON accounts_auditlog(action, timestamp);",
                 
                 # Attachment indexes
@@ -80,6 +83,28 @@ class Command(BaseCommand):
                 "CREATE INDEX IF NOT EXISTS idx_reportrequest_scheduled ON reports_reportrequest(is_scheduled, next_run_date);",
                 "CREATE INDEX IF NOT EXISTS idx_reportrequest_created ON reports_reportrequest(created_at);",
             ]
+
+            # Trigram indexes for admin icontains searches (PostgreSQL only)
+            if connection.vendor == 'postgresql':
+                indexes += [
+                    "CREATE EXTENSION IF NOT EXISTS pg_trgm;",
+                    "CREATE INDEX IF NOT EXISTS idx_auditlog_object_repr_trgm ON accounts_auditlog USING gin (UPPER(object_repr) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_auditlog_user_email_trgm ON accounts_auditlog USING gin (UPPER(user_email) gin_trgm_ops);",
+
+                    # Audit rows are append-only, so a BRIN index covers timestamp range scans at a fraction of a btree's size
+                    "CREATE INDEX IF NOT EXISTS idx_auditlog_timestamp_brin ON accounts_auditlog USING brin (timestamp) WITH (pages_per_range = 32);",
+
+                    # UserAdmin search_fields
+                    "CREATE INDEX IF NOT EXISTS idx_user_username_trgm ON auth_user USING gin (UPPER(username) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_user_first_name_trgm ON auth_user USING gin (UPPER(first_name) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_user_last_name_trgm ON auth_user USING gin (UPPER(last_name) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_user_email_trgm ON auth_user USING gin (UPPER(email) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_userprofile_employee_number_trgm ON accounts_userprofile USING gin (UPPER(employee_number) gin_trgm_ops);",
+                    "CREATE INDEX IF NOT EXISTS idx_userprofile_job_title_trgm ON accounts_userprofile USING gin (UPPER(job_title) gin_trgm_ops);",
+
+                    # Plan item / progress admin search on responsible_officer
+                    "CREATE INDEX IF NOT EXISTS idx_planitem_responsible_officer_trgm ON core_operationalplanitem USING gin (UPPER(responsible_officer) gin_trgm_ops);",
+                ]
             
             for index_sql in indexes:
                 try:
@@ -2,6 +2,8 @@
 Management command to populate the database with the complete organizational structure
 """
 
+import re
+
 from django.core.management.base import BaseCommand
 from django.contrib.auth.models import User
 from django.db import transaction
@@ -10,6 +12,11 @@ from core.models import OrgUnit, Staff
 from accounts.models import UserProfile
 
 
+# Job title fragments checked once per imported staff member, one pass per tier
+SENIOR_TITLE_RE = re.compile(r'DIRECTOR-GENERAL|CHIEF DIRECTOR')
+PROGRAMME_TITLE_RE = re.compile(r'DIRECTOR:|DD:|DEPUTY DIRECTOR|ASD:|ASSISTANT DIRECTOR')
+
+
 class Command(BaseCommand):
     help = 'Populate the database with the complete organizational structure'
 
@@ -448,23 +455,9 @@ class Command(BaseCommand):
         """Determine user role based on job title"""
         title_upper = job_title.upper()
 
-        # CEO is the only true senior manager
-        if 'CEO' in title_upper and 'OFFICE' not in title_upper:
-            return 'SENIOR_MANAGER'
-        elif 'DIRECTOR-GENERAL' in title_upper:
+        # CEO is the only true senior manager; CEO Office staff are regular staff
+        if ('CEO' in title_upper and 'OFFICE' not in title_upper) or SENIOR_TITLE_RE.search(title_upper):
             return 'SENIOR_MANAGER'
-        elif 'CHIEF DIRECTOR' in title_upper:
-            return 'SENIOR_MANAGER'
-        elif 'DIRECTOR:' in title_upper:
-            return 'PROGRAMME_MANAGER'
-        elif 'DD:' in title_upper or 'DEPUTY DIRECTOR' in title_upper:
+        if PROGRAMME_TITLE_RE.search(title_upper):
             return 'PROGRAMME_MANAGER'
-        elif 'ASD:' in title_upper or 'ASSISTANT DIRECTOR' in title_upper:
-            return 'PROGRAMME_MANAGER'
-        elif 'SAO:' in title_upper or 'SENIOR ADMINISTRATIVE' in title_upper:
-            return 'ME_STRATEGY'
-        # CEO Office staff (including Belina Molaba) are regular staff, not executives
-        elif 'OFFICE OF CEO' in title_upper or 'CEO OFFICE' in title_upper:
-            return 'ME_STRATEGY'
-        else:
-            return 'ME_STRATEGY'  # Default role for other staff
+        return 'ME_STRATEGY'  # SAO and all other staff
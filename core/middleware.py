@@ -5,12 +5,74 @@ This module provides middleware for audit logging, request tracking,
 and security enhancements.
 """
 
+import ipaddress
 import json
 import time
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 from django.contrib.auth.models import AnonymousUser
 from django.http import JsonResponse
-from accounts.models import AuditLog
+from accounts.models import AuditLogBuffer, audit_logger
+
+
+def _valid_ip(value):
+    try:
+        return str(ipaddress.ip_address(value.strip()))
+    except ValueError:
+        return None
+
+
+def _trusted_networks():
+    """Networks from settings.TRUSTED_PROXIES; none when unset, so X-Forwarded-For is ignored"""
+    trusted = getattr(settings, 'TRUSTED_PROXIES', None) or ()
+    return [ipaddress.ip_network(proxy.strip(), strict=False) for proxy in trusted]
+
+
+def _is_trusted_proxy(address, networks):
+    try:
+        peer = ipaddress.ip_address(address)
+    except (TypeError, ValueError):
+        return False
+    return any(peer in network for network in networks)
+
+
+def client_ip(request):
+    """
+    The client's IP address, worked out once per request and kept on request.client_ip
+
+    Each trusted proxy appends the address it received from to X-Forwarded-For, so
+    the header is walked from the right, past trusted proxies, to the first address
+    a trusted proxy vouches for. Anything further left was written by the client
+    and may be forged. Without trusted proxies (or from any other peer) REMOTE_ADDR.
+    """
+    if not hasattr(request, 'client_ip'):
+        ip = request.META.get('REMOTE_ADDR')
+        networks = _trusted_networks()
+        if networks and _is_trusted_proxy(ip, networks):
+            for entry in reversed(request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')):
+                hop = _valid_ip(entry)
+                if hop is None:
+                    break
+                ip = hop
+                if not _is_trusted_proxy(hop, networks):
+                    break
+        request.client_ip = ip
+    return request.client_ip
+
+
+def client_ip_key(group, request):
+    """django-ratelimit key: the client IP, so proxied clients don't share the proxy's bucket"""
+    return client_ip(request)
+
+
+class ClientIPMiddleware(MiddlewareMixin):
+    """
+    Middleware to set request.client_ip for views and audit logging
+    """
+
+    def process_request(self, request):
+        client_ip(request)
+        return None
 
 
 class AuditLogMiddleware(MiddlewareMixin):
@@ -23,12 +85,27 @@ class AuditLogMiddleware(MiddlewareMixin):
         super().__init__(get_response)
     
     def process_request(self, request):
-        """Store request start time"""
+        """Store request start time and open the audit buffer"""
         request._audit_start_time = time.time()
+        AuditLogBuffer.start()
+        AuditLogBuffer.bind_request(request)
         return None
     
     def process_response(self, request, response):
-        """Log the request/response for audit purposes"""
+        """Log the request/response, then write all audit entries buffered during it"""
+        try:
+            self._log_request(request, response)
+        finally:
+            try:
+                AuditLogBuffer.flush()
+            except Exception:
+                # Don't let audit logging break the application, but don't lose the error either
+                audit_logger.exception('Audit log flush failed for %s %s', request.method, request.path)
+        
+        return response
+    
+    def _log_request(self, request, response):
+        """Queue an audit entry for the request if it is worth logging"""
         
         # Skip logging for certain paths
         skip_paths = [
@@ -39,15 +116,15 @@ class AuditLogMiddleware(MiddlewareMixin):
         ]
         
         if any(request.path.startswith(path) for path in skip_paths):
-            return response
+            return
         
         # Skip logging for GET requests to avoid too much noise
         if request.method == 'GET' and not request.path.startswith('/admin/'):
-            return response
+            return
         
         # Only log for authenticated users
         if isinstance(request.user, AnonymousUser):
-            return response
+            return
         
         try:
             # Determine action based on method and path
@@ -76,8 +153,8 @@ class AuditLogMiddleware(MiddlewareMixin):
                             post_data[field] = '[FILTERED]'
                     additional_data['request_data'] = post_data
                 
-                # Create audit log entry
-                AuditLog.objects.create(
+                # Queue audit log entry (written when the response is flushed)
+                AuditLogBuffer.enqueue(
                     user=request.user,
                     user_email=request.user.email,
                     user_ip_address=ip_address,
@@ -92,8 +169,6 @@ class AuditLogMiddleware(MiddlewareMixin):
         except Exception as e:
             # Don't let audit logging break the application
             pass
-        
-        return response
     
     def _determine_action(self, method, path, status_code):
         """Determine the action type based on request details"""
@@ -118,12 +193,7 @@ class AuditLogMiddleware(MiddlewareMixin):
     
     def _get_client_ip(self, request):
         """Get the client IP address from request"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return client_ip(request)
 
 
 class SecurityHeadersMiddleware(MiddlewareMixin):
@@ -229,12 +299,7 @@ class RateLimitMiddleware(MiddlewareMixin):
     
     def _get_client_ip(self, request):
         """Get the client IP address from request"""
-        x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-        if x_forwarded_for:
-            ip = x_forwarded_for.split(',')[0]
-        else:
-            ip = request.META.get('REMOTE_ADDR')
-        return ip
+        return client_ip(request)
     
     def _cleanup_old_entries(self, current_time):
         """Remove old rate limit entries"""
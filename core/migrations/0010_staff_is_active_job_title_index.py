@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_add_staff_contact_fields'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='staff',
+            index=models.Index(fields=['is_active', 'job_title'], name='core_staff_is_acti_0ecb7c_idx'),
+        ),
+    ]
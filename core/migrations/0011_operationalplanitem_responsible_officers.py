@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-16 10:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('core', '0010_staff_is_active_job_title_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='operationalplanitem',
+            name='responsible_officers',
+            field=models.ManyToManyField(blank=True, help_text='Users named in responsible_officer, kept in sync on save for access checks', related_name='responsible_plan_items', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
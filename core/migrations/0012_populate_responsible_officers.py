@@ -0,0 +1,30 @@
+from django.db import migrations
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
+from django.db.models.lookups import IContains
+
+
+def link_responsible_officers(apps, schema_editor):
+    """Link each plan item to the users whose full name appears in responsible_officer"""
+    User = apps.get_model('auth', 'User')
+    OperationalPlanItem = apps.get_model('core', 'OperationalPlanItem')
+
+    named_users = User.objects.annotate(
+        full_name=Trim(Concat('first_name', Value(' '), 'last_name'))
+    ).exclude(full_name='')
+
+    for item in OperationalPlanItem.objects.only('id', 'responsible_officer').iterator():
+        item.responsible_officers.set(
+            named_users.filter(IContains(Value(item.responsible_officer), F('full_name')))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_operationalplanitem_responsible_officers'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_responsible_officers, migrations.RunPython.noop),
+    ]
@@ -6,6 +6,9 @@ of the GCRA Operational Plan structure: FinancialYear, KPA, and OperationalPlanI
 """
 
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Concat, Trim
+from django.db.models.lookups import IContains
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -13,6 +16,30 @@ from decimal import Decimal
 import uuid
 
 
+def officer_full_name(first_name='first_name', last_name='last_name'):
+    """A user's full name as it is matched against responsible officer text"""
+    return Trim(Concat(first_name, Value(' '), last_name))
+
+
+def names_officer(officer_text, full_name):
+    """The "named in" match: full_name appears (case-insensitively) in officer_text"""
+    return IContains(officer_text, full_name)
+
+
+def users_named_in(officer_text):
+    """Users whose full name appears (case-insensitively) in a responsible officer string"""
+    return User.objects.annotate(
+        full_name=officer_full_name()
+    ).exclude(full_name='').filter(names_officer(Value(officer_text), F('full_name')))
+
+
+def plan_items_naming(user):
+    """Plan items whose responsible officer string names the user; the converse of users_named_in"""
+    return OperationalPlanItem.objects.annotate(
+        officer_name=officer_full_name(Value(user.first_name), Value(user.last_name))
+    ).exclude(officer_name='').filter(names_officer(F('responsible_officer'), F('officer_name')))
+
+
 class BaseModel(models.Model):
     """
     Abstract base model with common fields for all models
@@ -226,6 +253,10 @@ class Staff(BaseModel):
         ordering = ['org_unit', 'last_name', 'first_name']
         verbose_name = "Staff Member"
         verbose_name_plural = "Staff Members"
+        indexes = [
+            # Distinct active job titles for the profile form dropdown
+            models.Index(fields=['is_active', 'job_title']),
+        ]
 
     def __str__(self):
         return f"{self.first_name} {self.last_name} ({self.persal_number})"
@@ -345,6 +376,12 @@ class OperationalPlanItem(BaseModel):
         max_length=200,
         help_text="Name of the officer responsible for delivery"
     )
+    responsible_officers = models.ManyToManyField(
+        User,
+        blank=True,
+        related_name='responsible_plan_items',
+        help_text="Users named in responsible_officer, kept in sync on save for access checks"
+    )
     unit_subdirectorate = models.CharField(
         max_length=200,
         blank=True,
@@ -382,6 +419,16 @@ class OperationalPlanItem(BaseModel):
     def __str__(self):
         return f"{self.output[:100]}... ({self.kpa.title})"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'responsible_officer' in update_fields:
+            self.sync_responsible_officers()
+
+    def sync_responsible_officers(self):
+        """Link the users named in responsible_officer so access checks are indexed joins"""
+        self.responsible_officers.set(users_named_in(self.responsible_officer))
+
     @property
     def total_budget(self):
         """Calculate total budget (input + output costs)"""
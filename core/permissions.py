@@ -10,6 +10,7 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404
 from rest_framework import permissions
 from functools import wraps
+from accounts.models import UserProfile
 from .models import KPA, OperationalPlanItem
 
 
@@ -35,7 +36,7 @@ class KPAPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
         if not user_profile:
             return False
         
@@ -57,7 +58,7 @@ class KPAPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
         if not user_profile:
             return False
         
@@ -79,9 +80,7 @@ class KPAPermission(permissions.BasePermission):
         if user_profile.primary_role == 'PROGRAMME_MANAGER':
             if request.method in permissions.SAFE_METHODS:
                 # Check if user is assigned to any plan items in this KPA
-                return obj.plan_items.filter(
-                    responsible_officer__icontains=request.user.get_full_name()
-                ).exists()
+                return obj.plan_items.filter(responsible_officers=request.user).exists()
             return False  # Cannot edit KPAs
         
         return False
@@ -95,7 +94,7 @@ class OperationalPlanItemPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
         if not user_profile:
             return False
         
@@ -106,14 +105,14 @@ class OperationalPlanItemPermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
         if not user_profile:
             return False
         
         # Use the can_edit_plan_item method from UserProfile
         if request.method in permissions.SAFE_METHODS:
             # For read operations, check if user can access the KPA
-            return user_profile.get_accessible_kpas().filter(id=obj.kpa.id).exists()
+            return obj.kpa_id in user_profile.get_accessible_kpa_ids()
         else:
             # For write operations, use the specific edit permission
             return user_profile.can_edit_plan_item(obj)
@@ -127,7 +126,7 @@ class ProgressUpdatePermission(permissions.BasePermission):
         if not request.user.is_authenticated:
             return False
         
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
         if not user_profile:
             return False
         
@@ -146,7 +145,7 @@ def require_role(*roles):
             if not request.user.is_authenticated:
                 raise PermissionDenied("Authentication required")
             
-            user_profile = getattr(request.user, 'profile', None)
+            user_profile = UserProfile.permissions_for(request.user)
             if not user_profile:
                 raise PermissionDenied("User profile required")
             
@@ -168,7 +167,7 @@ def require_kpa_access(kpa_param='kpa_id'):
             if not request.user.is_authenticated:
                 raise PermissionDenied("Authentication required")
             
-            user_profile = getattr(request.user, 'profile', None)
+            user_profile = UserProfile.permissions_for(request.user)
             if not user_profile:
                 raise PermissionDenied("User profile required")
             
@@ -179,9 +178,8 @@ def require_kpa_access(kpa_param='kpa_id'):
             
             # Check if user can access this KPA
             kpa = get_object_or_404(KPA, id=kpa_id)
-            accessible_kpas = user_profile.get_accessible_kpas()
             
-            if not accessible_kpas.filter(id=kpa.id).exists():
+            if kpa.id not in user_profile.get_accessible_kpa_ids():
                 raise PermissionDenied("Access to this KPA not authorized")
             
             return view_func(request, *args, **kwargs)
@@ -199,7 +197,7 @@ def require_plan_item_edit_access(plan_item_param='plan_item_id'):
             if not request.user.is_authenticated:
                 raise PermissionDenied("Authentication required")
             
-            user_profile = getattr(request.user, 'profile', None)
+            user_profile = UserProfile.permissions_for(request.user)
             if not user_profile:
                 raise PermissionDenied("User profile required")
             
@@ -225,7 +223,7 @@ def user_can_approve_updates(user):
     if not user.is_authenticated:
         return False
     
-    user_profile = getattr(user, 'profile', None)
+    user_profile = UserProfile.permissions_for(user)
     if not user_profile:
         return False
     
@@ -237,19 +235,27 @@ def user_can_generate_reports(user):
     if not user.is_authenticated:
         return False
     
-    user_profile = getattr(user, 'profile', None)
+    user_profile = UserProfile.permissions_for(user)
     if not user_profile:
         return False
     
     return user_profile.can_generate_reports
 
 
+def user_is_system_admin(user):
+    """Check if user has the System Admin role (cached on the user instance)"""
+    if not hasattr(user, '_is_system_admin'):
+        user_profile = UserProfile.permissions_for(user)
+        user._is_system_admin = bool(user_profile and user_profile.primary_role == 'SYSTEM_ADMIN')
+    return user._is_system_admin
+
+
 def user_can_view_all_kpas(user):
     """Check if user can view all KPAs"""
     if not user.is_authenticated:
         return False
     
-    user_profile = getattr(user, 'profile', None)
+    user_profile = UserProfile.permissions_for(user)
     if not user_profile:
         return False
     
@@ -264,7 +270,7 @@ def filter_kpas_for_user(queryset, user):
     if not user.is_authenticated:
         return queryset.none()
     
-    user_profile = getattr(user, 'profile', None)
+    user_profile = UserProfile.permissions_for(user)
     if not user_profile:
         return queryset.none()
     
@@ -276,7 +282,7 @@ def filter_plan_items_for_user(queryset, user):
     if not user.is_authenticated:
         return queryset.none()
 
-    user_profile = getattr(user, 'profile', None)
+    user_profile = UserProfile.permissions_for(user)
     if not user_profile:
         return queryset.none()
 
@@ -293,7 +299,7 @@ def require_manager_role(view_func):
         if not request.user.is_authenticated:
             raise PermissionDenied("Authentication required")
 
-        user_profile = getattr(request.user, 'profile', None)
+        user_profile = UserProfile.permissions_for(request.user)
 
         # Check if user has manager role in profile
         if user_profile and user_profile.primary_role in ['SENIOR_MANAGER', 'PROGRAMME_MANAGER']:
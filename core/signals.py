@@ -0,0 +1,57 @@
+"""
+Signal handlers for the core app
+"""
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from accounts.models import UserProfile
+from .forms import MANAGER_CHOICES_CACHE_KEY, ORG_UNIT_CHOICES_CACHE_KEY
+from .models import OrgUnit, Staff, plan_items_naming
+
+# User fields shown in, or filtering, the KPA owner choices
+MANAGER_USER_FIELDS = {'first_name', 'last_name', 'is_active'}
+
+# User fields that decide which plan items name the user as responsible officer
+OFFICER_NAME_FIELDS = {'first_name', 'last_name'}
+
+
+@receiver([post_save, post_delete], sender=Staff)
+@receiver([post_save, post_delete], sender=UserProfile)
+@receiver([post_save, post_delete], sender=OrgUnit)
+def clear_manager_choices(sender, **kwargs):
+    """Drop the cached KPA owner choices when managers or their units change"""
+    cache.delete(MANAGER_CHOICES_CACHE_KEY)
+
+
+@receiver([post_save, post_delete], sender=OrgUnit)
+def clear_org_unit_choices(sender, **kwargs):
+    """Drop the cached KPA org unit choices when an org unit changes"""
+    cache.delete(ORG_UNIT_CHOICES_CACHE_KEY)
+
+
+@receiver(post_save, sender=User)
+def clear_manager_choices_for_user(sender, update_fields=None, **kwargs):
+    if update_fields is not None and not MANAGER_USER_FIELDS & set(update_fields):
+        return  # e.g. the last_login update on every login
+    cache.delete(MANAGER_CHOICES_CACHE_KEY)
+
+
+@receiver(post_init, sender=User)
+def remember_officer_name(sender, instance, **kwargs):
+    """Note the name the user was loaded with, so saves that keep it skip the re-link below"""
+    instance._loaded_officer_name = (instance.__dict__.get('first_name'), instance.__dict__.get('last_name'))
+
+
+@receiver(post_save, sender=User)
+def sync_responsible_plan_items(sender, instance, created, update_fields=None, **kwargs):
+    """Re-link the plan items naming this user, for users created or renamed after the items were saved"""
+    if update_fields is not None and not OFFICER_NAME_FIELDS & set(update_fields):
+        return
+    name = (instance.first_name, instance.last_name)
+    if not created and name == getattr(instance, '_loaded_officer_name', None):
+        return  # e.g. set_password() or an admin save that leaves the name alone
+    instance._loaded_officer_name = name
+    instance.responsible_plan_items.set(plan_items_naming(instance))
@@ -0,0 +1,27 @@
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from core.middleware import client_ip
+
+
+class ClientIPTests(SimpleTestCase):
+    def _ip(self, remote_addr, forwarded_for=None):
+        meta = {'REMOTE_ADDR': remote_addr}
+        if forwarded_for is not None:
+            meta['HTTP_X_FORWARDED_FOR'] = forwarded_for
+        return client_ip(RequestFactory().get('/', **meta))
+
+    @override_settings(TRUSTED_PROXIES=None)
+    def test_forwarded_for_ignored_without_trusted_proxies(self):
+        self.assertEqual(self._ip('198.51.100.7', '203.0.113.1'), '198.51.100.7')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_forwarded_for_ignored_from_untrusted_peer(self):
+        self.assertEqual(self._ip('198.51.100.7', '203.0.113.1'), '198.51.100.7')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_rightmost_untrusted_hop_wins_over_spoofed_entries(self):
+        # The client forged 1.2.3.4; the trusted proxies appended the real address and each other
+        self.assertEqual(self._ip('10.0.0.2', '1.2.3.4, 203.0.113.9, 10.0.0.1'), '203.0.113.9')
+
+    @override_settings(TRUSTED_PROXIES=['10.0.0.0/8'])
+    def test_garbage_entry_stops_the_walk(self):
+        self.assertEqual(self._ip('10.0.0.2', '203.0.113.9, not-an-ip'), '10.0.0.2')
@@ -459,7 +459,7 @@ def plan_item_update_field(request, item_id):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     from django.http import JsonResponse
-    from accounts.models import AuditLog, UserProfile
+    from accounts.models import AuditLogBuffer, UserProfile
 
     item = get_object_or_404(OperationalPlanItem, id=item_id)
 
@@ -509,16 +509,12 @@ def plan_item_update_field(request, item_id):
 
     # Audit log
     try:
-        AuditLog.objects.create(
-            user=request.user,
-            user_email=request.user.email,
-            user_ip_address=request.META.get('REMOTE_ADDR'),
+        AuditLogBuffer.enqueue(
             action='UPDATE',
             model_name='OperationalPlanItem',
             object_id=str(item.id),
             object_repr=str(item),
             changes={'field': field, 'old': str(old_value), 'new': str(getattr(item, field))},
-            session_key=getattr(request, 'session', None) and request.session.session_key,
         )
     except Exception:
         pass
@@ -541,17 +537,13 @@ def plan_item_create_view(request):
             item.save()
             # Audit log (best-effort)
             try:
-                from accounts.models import AuditLog
-                AuditLog.objects.create(
-                    user=request.user,
-                    user_email=request.user.email,
-                    user_ip_address=request.META.get('REMOTE_ADDR'),
+                from accounts.models import AuditLogBuffer
+                AuditLogBuffer.enqueue(
                     action='CREATE',
                     model_name='OperationalPlanItem',
                     object_id=str(item.id),
                     object_repr=str(item),
                     changes={'created_fields': {k: str(v) for k, v in form.cleaned_data.items()}},
-                    session_key=getattr(request, 'session', None) and request.session.session_key,
                 )
             except Exception:
                 pass
@@ -596,20 +588,18 @@ def _get_org_units_data():
     ]
     return org_units_all, json.dumps(org_units_data)
 
-def _log_kpa_action(user, action, kpa, changes=None, request=None):
+def _log_kpa_action(user, action, kpa, changes=None):
     """Helper function to log KPA actions"""
     try:
-        from accounts.models import AuditLog
-        AuditLog.objects.create(
+        from accounts.models import AuditLogBuffer
+        AuditLogBuffer.enqueue(
             user=user,
             user_email=user.email,
-            user_ip_address=request.META.get('REMOTE_ADDR') if request else None,
             action=action,
             model_name='KPA',
             object_id=str(kpa.id),
             object_repr=str(kpa),
             changes=changes or {},
-            session_key=getattr(request, 'session', None) and request.session.session_key if request else None,
         )
     except Exception:
         pass
@@ -705,7 +695,7 @@ def kpa_create_view(request):
             form.save_m2m()
 
             _log_kpa_action(request.user, 'CREATE', kpa,
-                          {'created_fields': {k: str(v) for k, v in form.cleaned_data.items()}}, request)
+                          {'created_fields': {k: str(v) for k, v in form.cleaned_data.items()}})
 
             from django.contrib import messages
             from django.shortcuts import redirect
@@ -748,7 +738,7 @@ def kpa_edit_view(request, kpa_id):
                 'old_values': {k: str(v) for k, v in old_values.items()},
                 'new_values': {k: str(v) for k, v in new_values.items()},
             }
-            _log_kpa_action(request.user, 'UPDATE', kpa, changes, request)
+            _log_kpa_action(request.user, 'UPDATE', kpa, changes)
 
             from django.contrib import messages
             from django.shortcuts import redirect
@@ -781,7 +771,7 @@ def kpa_delete_view(request, kpa_id):
         if request.POST.get('confirm') == 'yes':
             kpa_title = kpa.title
             _log_kpa_action(request.user, 'DELETE', kpa,
-                          {'deleted_kpa': str(kpa)}, request)
+                          {'deleted_kpa': str(kpa)})
 
             kpa.delete()
 
@@ -816,17 +806,13 @@ def target_create_view(request, item_id):
             target.save()
             # Audit log best-effort
             try:
-                from accounts.models import AuditLog
-                AuditLog.objects.create(
-                    user=request.user,
-                    user_email=request.user.email,
-                    user_ip_address=request.META.get('REMOTE_ADDR'),
+                from accounts.models import AuditLogBuffer
+                AuditLogBuffer.enqueue(
                     action='CREATE',
                     model_name='Target',
                     object_id=str(target.id),
                     object_repr=str(target),
                     changes={'created_fields': {k: str(v) for k, v in form.cleaned_data.items()}},
-                    session_key=getattr(request, 'session', None) and request.session.session_key,
                 )
             except Exception:
                 pass
@@ -880,17 +866,13 @@ def update_wizard_view(request, target_id):
                 upd.is_submitted = True
                 upd.save()
                 try:
-                    from accounts.models import AuditLog
-                    AuditLog.objects.create(
-                        user=request.user,
-                        user_email=request.user.email,
-                        user_ip_address=request.META.get('REMOTE_ADDR'),
+                    from accounts.models import AuditLogBuffer
+                    AuditLogBuffer.enqueue(
                         action='CREATE',
                         model_name='ProgressUpdate',
                         object_id=str(upd.id),
                         object_repr=str(upd),
                         changes={'created_fields': {k: str(v) for k, v in form.cleaned_data.items()}},
-                        session_key=getattr(request, 'session', None) and request.session.session_key,
                     )
                 except Exception:
                     pass
@@ -41,7 +41,7 @@ def manager_dashboard_view(request):
     elif user_profile.primary_role == 'PROGRAMME_MANAGER':
         # Programme managers see KPAs they're assigned to or own
         kpas = KPA.objects.filter(
-            Q(plan_items__responsible_officer__icontains=request.user.get_full_name()) |
+            Q(plan_items__responsible_officers=request.user) |
             Q(owner=request.user)
         ).filter(is_active=True).distinct()
         dashboard_title = "Programme Manager Dashboard"
@@ -144,8 +144,7 @@ def manager_kpa_detail_view(request, kpa_id):
     user_profile = getattr(request.user, 'profile', None)
     
     # Check if user can access this KPA
-    accessible_kpas = user_profile.get_accessible_kpas() if user_profile else KPA.objects.none()
-    if not accessible_kpas.filter(id=kpa.id).exists():
+    if not user_profile or kpa.id not in user_profile.get_accessible_kpa_ids():
         messages.error(request, "You don't have access to this KPA.")
         return redirect('manager_dashboard')
     
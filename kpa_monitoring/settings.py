@@ -22,6 +22,10 @@ SECRET_KEY = os.getenv('DJANGO_SECRET_KEY', get_random_secret_key())
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv('DJANGO_DEBUG', 'True').lower() == 'true' if ENVIRONMENT == 'development' else False
 
+# Proxy addresses/networks whose X-Forwarded-For is believed; unset, REMOTE_ADDR is the client.
+# Set this behind a load balancer, or every client shares the balancer's address (and rate limits).
+TRUSTED_PROXIES = os.getenv('TRUSTED_PROXIES').split(',') if os.getenv('TRUSTED_PROXIES') else None
+
 ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', 'localhost,127.0.0.1').split(',') if ENVIRONMENT == 'production' else ['*']
 
 # Application definition
@@ -56,6 +60,7 @@ INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.ClientIPMiddleware',
     'core.middleware.SecurityHeadersMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -137,6 +142,16 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashers - the first entry is used for all user-chosen passwords
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'accounts.hashers.TempPasswordHasher',
+]
+
 # Internationalization
 LANGUAGE_CODE = 'en-za'
 TIME_ZONE = 'Africa/Johannesburg'
@@ -154,6 +169,9 @@ STATICFILES_DIRS = [
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Delete replaced uploads inline instead of queueing them for purge_blobs
+SYNC_BLOB_DELETE = os.getenv('SYNC_BLOB_DELETE', 'False').lower() == 'true'
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -203,6 +221,7 @@ Q_CLUSTER = {
     'queue_limit': 500,
     'cpu_affinity': 1,
     'label': 'Django Q',
+    'sync': DEBUG,  # Development runs tasks inline, without a Redis broker or qcluster
     'redis': {
         'host': os.getenv('REDIS_HOST', '127.0.0.1'),
         'port': int(os.getenv('REDIS_PORT', 6379)),
@@ -296,6 +315,14 @@ CACHES = {
     }
 }
 
+# Fraction of successful audit entries kept per (action, model_name); failures are always kept.
+# JWT clients can log in on every token exchange, so API auth can be sampled via the environment.
+AUDIT_API_AUTH_SAMPLE_RATE = float(os.getenv('AUDIT_API_AUTH_SAMPLE_RATE', '1.0'))
+AUDIT_SAMPLE_RATES = {
+    ('LOGIN', 'API_AUTH'): AUDIT_API_AUTH_SAMPLE_RATE,
+    ('LOGOUT', 'API_AUTH'): AUDIT_API_AUTH_SAMPLE_RATE,
+}
+
 # Session configuration
 SESSION_ENGINE = 'django.contrib.sessions.backends.cache'
 SESSION_CACHE_ALIAS = 'default'
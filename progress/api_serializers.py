@@ -21,3 +21,26 @@ class ProgressUpdateSerializer(serializers.ModelSerializer):
             'forecast_value', 'forecast_confidence', 'is_submitted', 'is_approved',
         ]
 
+
+
+class EvidenceUrlsField(serializers.ListField):
+    """A list of URLs, also accepted as newline-separated text from a textarea"""
+
+    child = serializers.CharField()
+
+    def to_internal_value(self, data):
+        if isinstance(data, str):
+            data = [data]
+        if isinstance(data, list):
+            data = [line.strip() for item in data for line in str(item).splitlines() if line.strip()]
+        return super().to_internal_value(data)
+
+
+class DraftProgressUpdateSerializer(ProgressUpdateSerializer):
+    """Autosave payload: the target comes from the view and drafts are never submitted"""
+
+    evidence_urls = EvidenceUrlsField(required=False)
+    is_submitted = serializers.HiddenField(default=False)
+
+    class Meta(ProgressUpdateSerializer.Meta):
+        read_only_fields = ['target']
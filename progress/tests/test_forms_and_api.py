@@ -1,4 +1,5 @@
 from datetime import date
+from decimal import Decimal
 from django.test import TestCase
 from django.contrib.auth.models import User
 from django.urls import reverse
@@ -122,6 +123,6 @@ class DraftAutosaveApiTests(TestCase):
         self.assertEqual(resp.status_code, 200)
         self.assertEqual(ProgressUpdate.objects.count(), 1)
         draft = ProgressUpdate.objects.first()
-        self.assertEqual(str(draft.actual_value), '7')
+        self.assertEqual(draft.actual_value, Decimal('7'))
         self.assertEqual(draft.narrative, 'B')
 